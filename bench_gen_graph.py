@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Random Graph Generator Benchmarks
+
+Run every graph type of gen_graph.py over a grid of sizes, with and without
+edge weights, and record wall time, peak RSS and edges/sec of the generation
+and output stages separately. Each case runs in a fresh process so its peak
+RSS is its own. Results are saved as JSON to track regressions between versions.
+
+Example:
+    $ python bench_gen_graph.py
+    $ python bench_gen_graph.py --sizes small medium --types grnm grnp
+    $ python bench_gen_graph.py --extra-args='--engine numpy' --types grnm
+    $ python bench_gen_graph.py --format bin --output bench.json
+"""
+
+import sys
+import os
+import argparse
+import json
+import time
+import tempfile
+import platform
+import multiprocessing
+import gen_graph
+
+# arguments of each graph type for each size
+SIZES = {
+    'small': {
+        'grnm': '-n 1000 -m 5000',
+        'grnd': '-n 1000 -d 4',
+        'grnp': '-n 1000 -p 0.01',
+        'gkn': '-n 100',
+        'gcn': '-n 10000',
+        'gpn': '-n 10000',
+        'trn': '-n 1000',
+        'tch': '-c 2 -h 10',
+        'tcn': '-c 3 -n 10000',
+        'gba': '-n 1000 -m 5',
+        'gpl': '-n 1000 -gamma 2.5 -avgdeg 10',
+        'gws': '-n 1000 -k 10 -p 0.1',
+        'grg': '-n 1000 -r 0.06',
+    },
+    'medium': {
+        'grnm': '-n 100000 -m 500000',
+        'grnd': '-n 100000 -d 4',
+        'grnp': '-n 100000 -p 0.00005',
+        'gkn': '-n 1000',
+        'gcn': '-n 500000',
+        'gpn': '-n 500000',
+        'trn': '-n 100000',
+        'tch': '-c 2 -h 18',
+        'tcn': '-c 3 -n 500000',
+        'gba': '-n 100000 -m 5',
+        'gpl': '-n 100000 -gamma 2.5 -avgdeg 10',
+        'gws': '-n 100000 -k 10 -p 0.1',
+        'grg': '-n 100000 -r 0.006',
+    },
+    'large': {
+        'grnm': '-n 1000000 -m 10000000',
+        'grnd': '-n 1000000 -d 8',
+        'grnp': '-n 1000000 -p 0.00001',
+        'gkn': '-n 4000',
+        'gcn': '-n 5000000',
+        'gpn': '-n 5000000',
+        'trn': '-n 1000000',
+        'tch': '-c 2 -h 22',
+        'tcn': '-c 3 -n 5000000',
+        'gba': '-n 1000000 -m 10',
+        'gpl': '-n 1000000 -gamma 2.5 -avgdeg 20',
+        'gws': '-n 1000000 -k 20 -p 0.1',
+        'grg': '-n 1000000 -r 0.0025',
+    },
+}
+
+# output name of binary formats, which need one though every case is written to os.devnull,
+# a path under os.devnull never exists
+NULL_OUTPUT = os.path.join(os.devnull, 'bench')
+
+def stage_result(seconds, num_edge):
+    """ Measurements of one stage """
+    return {'seconds': seconds,
+            'edges_per_sec': num_edge / seconds if seconds > 0 else None,
+            'peak_rss_kb': gen_graph.peak_rss_kb()}
+
+def run_case(argv):
+    """ Generate and output one graph to the null device, or a temporary file for npz-csr,
+    return its measurements
+    """
+    start = time.perf_counter()
+    try:
+        args = gen_graph.parse_arguments(argv)
+    except SystemExit:
+        return {'argv': argv, 'error': 'invalid arguments'}
+    parse_seconds = time.perf_counter() - start
+    nx = gen_graph.load_networkx(args)
+    rss_before = gen_graph.peak_rss_kb()
+
+    start = time.perf_counter()
+    graph = gen_graph.gen_graph(nx, args)
+    gen_seconds = time.perf_counter() - start
+    if graph is None:
+        return {'argv': argv, 'error': 'generation failed'}
+    num_edge = graph.number_of_edges()
+    generate = stage_result(gen_seconds, num_edge)
+
+    if args.format == 'npz-csr':
+        # a zip archive seeks back to write its directory, which the null device cannot do
+        with tempfile.TemporaryDirectory() as tmpdir:
+            start = time.perf_counter()
+            gen_graph.write_graph_file(os.path.join(tmpdir, 'bench.npz'), graph, args)
+            output = stage_result(time.perf_counter() - start, num_edge)
+    else:
+        start = time.perf_counter()
+        gen_graph.write_graph_file(os.devnull, graph, args)
+        output = stage_result(time.perf_counter() - start, num_edge)
+
+    return {'argv': argv, 'num_nodes': graph.number_of_nodes(), 'num_edges': num_edge,
+            'parse_seconds': parse_seconds, 'baseline_rss_kb': rss_before,
+            'generate': generate, 'output': output}
+
+def make_cases(args):
+    """ Command line arguments of each benchmark case """
+    cases = []
+    for size in args.sizes:
+        for name in args.types:
+            argv = ['-' + name] + SIZES[size][name].split() + ['--seed', '0']
+            argv += ['--format', args.format] + args.extra_args.split()
+            if args.format in gen_graph.BINARY_FORMATS:
+                argv += ['--output', NULL_OUTPUT + gen_graph.FORMAT_EXTENSIONS[args.format]]
+            for weight in args.weights:
+                cases.append((size, argv + ([] if weight == 'none' else ['-w', weight])))
+    return cases
+
+def run_benchmarks(args):
+    """ Run each case args.repeat times in a fresh process and collect results """
+    results = []
+    # a new worker process for each case, so peak RSS is not shared by cases
+    with multiprocessing.Pool(processes=1, maxtasksperchild=1) as pool:
+        for size, argv in make_cases(args):
+            for _ in range(args.repeat):
+                result = pool.apply(run_case, (argv,))
+                result['size'] = size
+                results.append(result)
+                print_result(result)
+    return results
+
+def print_result(result):
+    """ Print one line of a benchmark result """
+    if 'error' in result:
+        print('%-50s %s' % (' '.join(result['argv']), result['error']))
+        return
+    gen, out = result['generate'], result['output']
+    print('%-50s %10d %9.3f %12.0f %9.3f %12.0f %10d' % (
+        ' '.join(result['argv']), result['num_edges'],
+        gen['seconds'], gen['edges_per_sec'] or 0, out['seconds'], out['edges_per_sec'] or 0,
+        out['peak_rss_kb']))
+    sys.stdout.flush()
+
+def create_parser():
+    """ Create argparse parser """
+    parser = argparse.ArgumentParser(description='Benchmark gen_graph.py')
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small'],
+                        help='sizes of graphs to benchmark')
+    parser.add_argument('--types', nargs='+', choices=gen_graph.GRAPH_TYPES,
+                        default=gen_graph.GRAPH_TYPES, help='graph types to benchmark')
+    parser.add_argument('--weights', nargs='+', choices=['none', 'int', 'float'],
+                        default=['none', 'int'], help='edge weights to benchmark')
+    parser.add_argument('--format', choices=list(gen_graph.FORMAT_EXTENSIONS), default='text',
+                        help='output format to benchmark')
+    parser.add_argument('--extra-args', type=str, default='',
+                        help='more gen_graph.py arguments of every case, e.g. "--engine numpy"')
+    parser.add_argument('--repeat', type=int, default=1,
+                        help='number of runs of each case')
+    parser.add_argument('--output', metavar='FILE', type=str, default='bench_gen_graph.json',
+                        help='JSON file of results')
+    return parser
+
+def main(argv):
+    """ Benchmark main entry """
+    args = create_parser().parse_args(argv)
+    print('%-50s %10s %9s %12s %9s %12s %10s' % (
+        'case', 'edges', 'gen s', 'gen edges/s', 'out s', 'out edges/s', 'peak KiB'))
+    results = run_benchmarks(args)
+    import numpy
+    import networkx
+    report = {
+        'gen_graph_version': gen_graph.__version__,
+        'python': platform.python_version(),
+        'numpy': numpy.__version__,
+        'networkx': networkx.__version__,
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+    with open(args.output, 'w') as fout:
+        json.dump(report, fout, indent=2)
+    print('Saved benchmark results in %s' % args.output)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
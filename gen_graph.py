@@ -20,6 +20,12 @@ Example:
     $ python gen_graph.py -grnm -n 5 -m 5 --vis
     $ python gen_graph.py -grnm -n 5 -m 5 --out g.txt
     $ python gen_graph.py -grnm -n 5 -m 5 -w int
+    $ python gen_graph.py -grnm -n 5 -m 5 --engine numpy
+    $ python gen_graph.py -grnp -n 5 -p 0.5 --exact-networkx
+    $ python gen_graph.py --batch jobs.jsonl
+    $ python gen_graph.py -grnd -n 10 -d 3 --seed-range 0:1000 --jobs 8
+    $ python gen_graph.py -grnm -n 100000 -m 1000000 --partitions 8 --jobs 4 --out g.txt --concat
+    $ python gen_graph.py -grnm -n 100000 -m 1000000 --shards 4 --shard-by hash --out g.bin --format bin
 
 Author: Deyuan Guo <guodeyuan@gmail.com>
 Date: Jan 5, 2020
@@ -27,13 +33,106 @@ Ref: https://networkx.github.io/documentation/stable/reference/generators.html
 Update: Nov 25, 2021. Support edge weights.
 """
 
+__version__ = '2.0.0'
+
 import sys
+import time
+# time module imports for --profile-startup
+IMPORT_START = time.perf_counter()
 import os
 import argparse
 import warnings
 import random
+import struct
+import io
+import json
+import hashlib
+import csv
+import shlex
+import copy
+import shutil
+import tempfile
+import importlib.util
+import contextlib
+from collections import deque
+from itertools import chain
+import numpy as np
+IMPORT_SECONDS = time.perf_counter() - IMPORT_START
 warnings.filterwarnings('ignore')
 
+# all graph types
+GRAPH_TYPES = ['grnm', 'grnd', 'grnp', 'gkn', 'gcn', 'gpn', 'trn', 'tch', 'tcn', 'gba', 'gpl',
+               'gws', 'grg']
+# graph types that can be generated by the numpy engine
+NUMPY_ENGINE_TYPES = ['grnm', 'grnp', 'grnd', 'trn', 'gkn', 'gcn', 'gpn', 'tch', 'tcn',
+                      'gba', 'gpl', 'gws', 'grg']
+# graph types that use the numpy engine by default
+NUMPY_DEFAULT_TYPES = ['grnp', 'gkn', 'gcn', 'gpn', 'tch', 'tcn', 'gba', 'gpl', 'gws', 'grg']
+# random stream of edge weights, independent of the graph generation stream
+WEIGHT_STREAM = 1
+# random streams of partitions of the edge index space
+PARTITION_STREAM = 2
+# random stream of edges added to the spanning tree of --connected graphs
+CONNECTED_STREAM = 3
+# numpy samples hypergeometric distributions of populations less than this
+MAX_HYPERGEOMETRIC = 10 ** 9
+# edge switch rounds to repair a stub pairing before pairing again
+REPAIR_ROUNDS = 100
+# stub pairings to try before giving up on a regular graph
+MAX_PAIRINGS = 100
+# redraws of a Watts-Strogatz rewired edge before keeping the lattice edge
+REWIRE_ROUNDS = 64
+# decimal digits of Euclidean distance weights
+DISTANCE_DIGITS = 6
+# estimated peak bytes per edge of in-memory generators, for --max-memory
+GNM_BYTES_PER_EDGE = 36
+REGULAR_BYTES_PER_EDGE = 56
+# max number of random numbers drawn at once
+CHUNK_SIZE = 1 << 22
+# number of edges or stubs scattered to bucket files at once
+SPILL_CHUNK_SIZE = 1 << 20
+# number of edges formatted at once when writing the edge list
+OUTPUT_CHUNK_SIZE = 1 << 16
+# buffer size of output files
+OUTPUT_BUFFER_SIZE = 1 << 22
+# output formats that need a file instead of stdout
+BINARY_FORMATS = ['npy', 'npz-csr', 'bin']
+# bin format header: magic, version, node id bytes, weight type, flags, num nodes, num edges
+BIN_MAGIC = b'RGGB'
+BIN_HEADER = struct.Struct('<4sBBBBqq')
+BIN_WEIGHT_TYPES = {None: 0, 'int': 1, 'float': 2}
+BIN_FLAG_DIRECTED = 1
+BIN_FLAG_ONE_BASED = 2
+# file extensions of output formats
+FORMAT_EXTENSIONS = {'text': '.txt', 'npy': '.npy', 'npz-csr': '.npz', 'bin': '.bin'}
+# modules of compressed output file extensions, gzip is built in
+COMPRESSION_MODULES = {'.gz': 'gzip', '.zst': 'zstandard', '.lz4': 'lz4'}
+# (min, default, max) compression level of compressed output file extensions
+COMPRESSION_LEVELS = {'.gz': (0, 6, 9), '.zst': (-7, 3, 22), '.lz4': (0, 0, 16)}
+# size of blocks compressed by each thread as an independent gzip member or zstd/lz4 frame
+COMPRESS_BLOCK_SIZE = 1 << 22
+# hosts that --serve listens on
+SERVE_HOSTS = ['localhost', '127.0.0.1', '::1']
+# chunks of a response buffered before its worker waits for the client
+SERVE_QUEUE_SIZE = 16
+# max bytes of a request body
+SERVE_MAX_BODY = 1 << 20
+# options of requests that would write files or change the server process
+SERVE_REJECTED = [('batch', '--batch'), ('seed_range', '--seed-range'), ('output', '--output'),
+                  ('visualize', '--visualize'), ('profile_startup', '--profile-startup'),
+                  ('stats', '--stats'), ('profile', '--profile'), ('summary', '--summary'),
+                  ('cache', '--cache'), ('serve', '--serve'),
+                  # python random is shared by concurrent requests
+                  ('legacy_weights', '--legacy-weights')]
+# default output file name template of seed sweeps, without extension
+SWEEP_OUTPUT = '{type}_n{n}_seed{seed}'
+# -tch has no -n, its trees are named by children and height
+SWEEP_OUTPUT_TCH = '{type}_c{c}_h{h}_seed{seed}'
+# arguments that do not change the output, left out of cache keys
+CACHE_IGNORED_ARGS = ['output', 'visualize', 'profile_startup', 'jobs', 'batch', 'seed_range',
+                      'exact_networkx', 'cache', 'cache_size', 'spill_dir', 'stats', 'profile',
+                      'run_stats', 'summary']
+
 def int_non_neg(arg):
     """ argparse type function: a non-negative int """
     try:
@@ -54,10 +153,57 @@ def float_prob(arg):
         raise argparse.ArgumentTypeError("must be in range [0.0, 1.0]: '%s'" % arg)
     return val
 
-def create_parser():
+def float_non_neg(arg):
+    """ argparse type function: a non-negative float """
+    try:
+        val = float(arg)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid float value: '%s'" % arg)
+    if not val >= 0.0:
+        raise argparse.ArgumentTypeError("must be zero or positive: '%s'" % arg)
+    return val
+
+def serve_address(arg):
+    """ argparse type function: a unix socket path, or [host:]port of localhost """
+    if arg.startswith('unix:'):
+        return arg[len('unix:'):]
+    if '/' in arg:
+        return arg
+    host, _, port = arg.rpartition(':')
+    host = host.strip('[]') or 'localhost'
+    if host not in SERVE_HOSTS:
+        raise argparse.ArgumentTypeError("only localhost can be served: '%s'" % arg)
+    if not port.isdigit() or int(port) > 65535:
+        raise argparse.ArgumentTypeError("invalid port: '%s'" % arg)
+    return host, int(port)
+
+def int_pos(arg):
+    """ argparse type function: a positive int """
+    val = int_non_neg(arg)
+    if val == 0:
+        raise argparse.ArgumentTypeError("must be positive: '%s'" % arg)
+    return val
+
+def seed_range(arg):
+    """ argparse type function: a range of seeds A:B, from A to B-1 """
+    try:
+        start, stop = [int(val) for val in arg.split(':')]
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid seed range: '%s'" % arg)
+    if start > stop:
+        raise argparse.ArgumentTypeError("empty seed range: '%s'" % arg)
+    return range(start, stop)
+
+class ApiArgumentParser(argparse.ArgumentParser):
+    """ Argument parser of the library API, raises ValueError instead of exiting """
+    def error(self, message):
+        raise ValueError(message)
+
+def create_parser(parser_class=argparse.ArgumentParser, add_help=True):
     """ Create argparse parser """
-    parser = argparse.ArgumentParser(add_help=False)
-    parser.add_argument('--help', action='help', help='show this help message and exit')
+    parser = parser_class(add_help=False)
+    if add_help:
+        parser.add_argument('--help', action='help', help='show this help message and exit')
 
     group = parser.add_mutually_exclusive_group(required=True)
     group.add_argument('-grnm', action='store_true',
@@ -78,19 +224,40 @@ def create_parser():
                        help='full c-ary tree with h height')
     group.add_argument('-tcn', action='store_true',
                        help='full c-ary tree with n nodes')
+    group.add_argument('-gba', action='store_true',
+                       help='Barabasi-Albert graph of n nodes, each new node attached to m nodes')
+    group.add_argument('-gpl', action='store_true',
+                       help='Chung-Lu graph of n nodes with power-law expected degrees')
+    group.add_argument('-gws', action='store_true',
+                       help='Watts-Strogatz small-world graph of n nodes, k neighbors, p rewiring')
+    group.add_argument('-grg', action='store_true',
+                       help='random geometric graph of n nodes in the unit square with radius r')
+    group.add_argument('--batch', metavar='FILE', type=str,
+                       help='generate graphs of all jobs in a JSONL or CSV manifest')
+    group.add_argument('--serve', metavar='ADDRESS', type=serve_address,
+                       help='serve edge lists over HTTP on localhost [host:]port or a unix socket '
+                            'path until interrupted')
 
     parser.add_argument('-n', metavar='node', type=int_non_neg,
                         help='number of nodes')
     parser.add_argument('-m', metavar='edge', type=int_non_neg,
-                        help='number of edges')
+                        help='number of edges, or edges of each new node of -gba')
     parser.add_argument('-d', metavar='degree', type=int_non_neg,
                         help='degree of nodes in a graph')
     parser.add_argument('-p', metavar='probability', type=float_prob,
-                        help='edge creation probability')
+                        help='edge creation probability, or rewiring probability of -gws')
     parser.add_argument('-h', metavar='height', type=int_non_neg,
                         help='tree height')
     parser.add_argument('-c', metavar='children', type=int_non_neg,
                         help='number of children in a tree')
+    parser.add_argument('-gamma', metavar='exponent', type=float,
+                        help='power-law exponent of expected degrees of -gpl')
+    parser.add_argument('-avgdeg', metavar='degree', type=float_non_neg,
+                        help='average expected degree of -gpl')
+    parser.add_argument('-k', metavar='neighbors', type=int_non_neg,
+                        help='number of nearest ring neighbors of -gws')
+    parser.add_argument('-r', metavar='radius', type=float_non_neg,
+                        help='distance threshold of -grg')
 
     parser.add_argument('-w', metavar='<int|float>', type=str, choices=['int', 'float'],
                         help='enable edge weight of type int or float')
@@ -98,50 +265,1109 @@ def create_parser():
                         help='minimum edge weight')
     parser.add_argument('-wmax', metavar='<100>', type=float, default=100,
                         help='maximum edge weight')
+    parser.add_argument('--legacy-weights', action='store_true',
+                        help='draw weights edge by edge with python random as old versions did')
+    parser.add_argument('--distance-weights', action='store_true',
+                        help='use Euclidean distance of -grg nodes as float edge weights')
 
     parser.add_argument('--directed', action='store_true',
                         help='generate directed graph')
+    parser.add_argument('--connected', action='store_true',
+                        help='start -grnm and -grnp from a random spanning tree, so the graph '
+                             'is connected')
     parser.add_argument('--one-based', action='store_true',
                         help='output edges using one-based node ids')
     parser.add_argument('--seed', metavar='N', type=int,
                         help='random seed')
+    engine = parser.add_mutually_exclusive_group()
+    engine.add_argument('--engine', type=str, choices=['networkx', 'numpy'],
+                        help='graph generation engine (numpy: all graph types; '
+                             'default: networkx for -grnm, -grnd, -trn, otherwise numpy)')
+    engine.add_argument('--exact-networkx', action='store_true',
+                        help='use networkx and legacy weights to reproduce seeded outputs of old versions')
+    parser.add_argument('--seed-range', metavar='A:B', type=seed_range,
+                        help='generate one graph per seed from A to B-1, output file name '
+                             'is a template of fields like {type}, {n} and {seed}')
+    parser.add_argument('--jobs', metavar='N', type=int_pos, default=1,
+                        help='number of processes to generate graphs of --batch or --seed-range, '
+                             'or worker threads of --serve')
+    parser.add_argument('--partitions', metavar='P', type=int_pos, default=1,
+                        help='split the edge index space of -grnm or -grnp into P partitions with '
+                             'independent random streams, sampled by --jobs processes and '
+                             'output as P shard files of --output')
+    parser.add_argument('--concat', action='store_true',
+                        help='concatenate shard files of --partitions into --output')
+    parser.add_argument('--shards', metavar='K', type=int_pos, default=1,
+                        help='output K shard files of --output partitioned by source node, '
+                             'plus a JSON manifest')
+    parser.add_argument('--shard-by', type=str, choices=['range', 'hash'], default='range',
+                        help='partition source nodes of --shards by id range or by id hash')
+    parser.add_argument('--max-memory', metavar='MB', type=int_pos,
+                        help='keep edge arrays of -grnm, -grnp and -grnd within MB megabytes by '
+                             'generating partitions one at a time or spilling to disk')
+    parser.add_argument('--spill-dir', metavar='DIR', type=str,
+                        help='directory of temporary files of --max-memory (default: system temp)')
     parser.add_argument('--visualize', action='store_true',
                         help='visualize generated graph using matplotlib')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='print time of module import and argument parsing to stderr')
+    parser.add_argument('--stats', metavar='FILE', nargs='?', const='-',
+                        help='report wall time, CPU time and peak memory of each stage, '
+                             'edges/sec and bytes written to stderr, or as JSON to FILE')
+    parser.add_argument('--summary', metavar='FILE', nargs='?', const='',
+                        help='write degrees, components and weights of the edges as JSON to FILE, '
+                             'by default <output>.summary.json')
+    parser.add_argument('--profile', metavar='FILE', type=str,
+                        help='dump cProfile statistics of the run to FILE')
     parser.add_argument('--output', metavar='FILE', type=str,
                         help='output generated graph as an edge list to a file')
+    parser.add_argument('--format', type=str, choices=['text'] + BINARY_FORMATS, default='text',
+                        help='output format: text edge list, (m,2|3) npy array, '
+                             'npz with csr arrays, or raw binary edge records')
+    parser.add_argument('--compress-level', metavar='L', type=int,
+                        help='compression level of --output files ending with .gz, .zst or .lz4 '
+                             '(default: 6, 3 and 0)')
+    parser.add_argument('--cache', metavar='DIR', type=str,
+                        help='serve seeded outputs from a cache directory instead of '
+                             'generating them again')
+    parser.add_argument('--cache-size', metavar='MB', type=int_pos, default=1024,
+                        help='evict least recently used files when --cache exceeds MB megabytes')
 
     return parser
 
-def parse_arguments(argv):
+def parse_arguments(argv, parser=None):
     """ Parse command line arguments """
-    parser = create_parser()
+    if parser is None:
+        parser = create_parser()
     args = parser.parse_args(argv)
+    if args.stats is not None and (args.batch is not None or args.seed_range is not None):
+        parser.error('--stats cannot be used with --batch or --seed-range')
+    if args.batch is not None:
+        if not os.path.isfile(args.batch):
+            parser.error('file %s does not exist' % args.batch)
+        return args
+    if args.serve is not None:
+        if isinstance(args.serve, str) and os.path.exists(args.serve):
+            parser.error('file %s already exists' % args.serve)
+        return args
 
     if args.n is None and not args.tch:
         parser.error('-n is required')
-    if args.m is None and args.grnm:
+    if args.m is None and (args.grnm or args.gba):
         parser.error('-m is required')
     if args.d is None and args.grnd:
         parser.error('-d is required')
-    if args.p is None and args.grnp:
+    if args.p is None and (args.grnp or args.gws):
         parser.error('-p is required')
     if args.h is None and args.tch:
         parser.error('-h is required')
     if args.c is None and (args.tch or args.tcn):
         parser.error('-c is required')
+    if args.gamma is None and args.gpl:
+        parser.error('-gamma is required')
+    if args.avgdeg is None and args.gpl:
+        parser.error('-avgdeg is required')
+    if args.k is None and args.gws:
+        parser.error('-k is required')
+    if args.r is None and args.grg:
+        parser.error('-r is required')
 
-    if args.directed and (args.grnd or args.trn):
+    if args.directed and (args.grnd or args.gba or args.gws or args.grg):
         parser.error('--directed is not supported for the graph type')
-    if args.output is not None and os.path.exists(args.output):
+    if args.distance_weights:
+        if not args.grg:
+            parser.error('--distance-weights is only supported by -grg')
+        if args.w == 'int' or args.legacy_weights:
+            parser.error('--distance-weights cannot be used with -w int or --legacy-weights')
+        args.w = 'float'
+    if args.exact_networkx:
+        args.engine = 'networkx'
+        args.legacy_weights = True
+    if args.engine is None:
+        default_numpy = (any(getattr(args, t) for t in NUMPY_DEFAULT_TYPES) or args.partitions > 1
+                         or args.max_memory is not None or args.connected)
+        # only the numpy random tree can be directed
+        default_numpy = default_numpy or (args.trn and args.directed)
+        args.engine = 'numpy' if default_numpy else 'networkx'
+    if args.directed and args.trn and args.engine != 'numpy':
+        parser.error('--directed -trn requires --engine numpy')
+    # networkx expected_degree_graph is undirected only
+    if args.directed and args.gpl and args.engine != 'numpy':
+        parser.error('--directed -gpl requires --engine numpy')
+    if args.engine == 'numpy' and not any(getattr(args, t) for t in NUMPY_ENGINE_TYPES):
+        parser.error('--engine numpy is not supported for the graph type')
+    if args.max_memory is not None and args.engine != 'numpy':
+        parser.error('--max-memory requires the numpy engine')
+    if args.connected:
+        if not (args.grnm or args.grnp):
+            parser.error('--connected is only supported by -grnm and -grnp')
+        if args.engine != 'numpy':
+            parser.error('--connected requires the numpy engine')
+        if args.partitions > 1 or args.max_memory is not None:
+            parser.error('--connected cannot be used with --partitions or --max-memory')
+    if args.partitions > 1:
+        if args.engine != 'numpy' or not (args.grnm or args.grnp):
+            parser.error('--partitions is only supported by -grnm and -grnp with the numpy engine')
+        if args.legacy_weights:
+            parser.error('--partitions does not support --legacy-weights')
+        if args.visualize and args.output is not None:
+            parser.error('--visualize cannot be used with --partitions and --output')
+        if args.output is not None and args.seed_range is None:
+            for i in range(args.partitions):
+                if os.path.exists(shard_filename(args.output, i)):
+                    parser.error('file %s already exists' % shard_filename(args.output, i))
+    if args.shards > 1:
+        if args.output is None:
+            parser.error('--shards requires --output')
+        if args.partitions > 1:
+            parser.error('--shards and --partitions cannot be used together')
+        if args.seed_range is None:
+            for i in range(args.shards):
+                if os.path.exists(shard_filename(args.output, i)):
+                    parser.error('file %s already exists' % shard_filename(args.output, i))
+    if args.concat and (args.partitions == 1 or args.output is None or args.format == 'npz-csr'):
+        parser.error('--concat needs --partitions, --output and a format other than npz-csr')
+    if args.seed_range is not None and args.seed is not None:
+        parser.error('--seed and --seed-range cannot be used together')
+    if args.seed_range is not None:
+        try:
+            outputs = [sweep_output(args, seed) for seed in args.seed_range]
+        except (KeyError, IndexError, ValueError):
+            parser.error('invalid --output template %s' % args.output)
+        if len(set(outputs)) < len(outputs):
+            parser.error('--output template must give each seed its own file, e.g. with {seed}')
+    if args.format in BINARY_FORMATS and args.output is None and args.seed_range is None:
+        parser.error('--format %s requires --output' % args.format)
+    # output files of seed sweeps are checked for each seed
+    if args.output is not None and args.seed_range is None and os.path.exists(args.output):
         parser.error('file %s already exists' % args.output)
 
     if args.wmin > args.wmax:
         parser.error('min weight is greater than max weight')
 
+    if args.summary is not None:
+        if args.summary == '' and args.output is None:
+            parser.error('--summary needs a file name when the edge list goes to stdout')
+        if args.summary != '' and args.seed_range is not None:
+            parser.error('--summary FILE cannot be used with --seed-range')
+        if args.partitions > 1 and args.output is not None:
+            parser.error('--summary cannot be used with --partitions and --output')
+
+    ext = compression_ext(args.output)
+    if ext:
+        if importlib.util.find_spec(COMPRESSION_MODULES[ext]) is None:
+            parser.error('%s output requires the %s module' % (ext, COMPRESSION_MODULES[ext]))
+        if args.concat:
+            parser.error('--concat does not support compressed output')
+        if args.format == 'npz-csr':
+            parser.error('npz-csr output is a zip file, it cannot be compressed')
+        low, _, high = COMPRESSION_LEVELS[ext]
+        if args.compress_level is not None and not low <= args.compress_level <= high:
+            parser.error('--compress-level of %s output must be in [%d, %d]' % (ext, low, high))
+    elif args.compress_level is not None:
+        parser.error('--compress-level requires --output ending with .gz, .zst or .lz4')
+
     return args
 
-def gen_graph(nx, args):
-    """ Generate a graph based on command line arguments """
+def graph_type(args):
+    """ Name of the graph type to generate, e.g. 'grnm' """
+    for name in GRAPH_TYPES:
+        if getattr(args, name):
+            return name
+    return None
+
+class GraphError(Exception):
+    """ Raised when graph parameters cannot be satisfied, like networkx.NetworkXError """
+
+class EdgeList(object):
+    """ A graph as a number of nodes and edges iterated in chunks of numpy arrays """
+    def __init__(self, num_nodes, num_edges, directed=False):
+        self.num_nodes = num_nodes
+        self.num_edges = num_edges
+        self.directed = directed
+
+    def number_of_nodes(self):
+        """ Number of nodes, same as networkx """
+        return self.num_nodes
+
+    def number_of_edges(self):
+        """ Number of edges, same as networkx """
+        return self.num_edges
+
+    def is_directed(self):
+        """ Whether the graph is directed, same as networkx """
+        return self.directed
+
+    def chunks(self, size=OUTPUT_CHUNK_SIZE):
+        """ Iterate over edges as (src, dst, weight) arrays, weight is None if not weighted """
+        raise NotImplementedError
+
+    def to_networkx(self, nx):
+        """ Convert to a networkx graph, e.g. for visualization """
+        graph = nx.DiGraph() if self.directed else nx.Graph()
+        graph.add_nodes_from(range(self.num_nodes))
+        for src, dst, weight in self.chunks():
+            if weight is None:
+                graph.add_edges_from(zip(src.tolist(), dst.tolist()))
+            else:
+                graph.add_weighted_edges_from(zip(src.tolist(), dst.tolist(), weight.tolist()))
+        return graph
+
+class EdgeArrays(EdgeList):
+    """ A graph stored as numpy arrays of edge end points instead of networkx dicts """
+    def __init__(self, num_nodes, src, dst, directed=False):
+        super(EdgeArrays, self).__init__(num_nodes, len(src), directed)
+        self.src = src
+        self.dst = dst
+        self.weight = None
+
+    @property
+    def weighted(self):
+        """ Whether edge weights are set """
+        return self.weight is not None
+
+    def set_weights(self, args):
+        """ Draw random weights of all edges """
+        self.weight = random_weights(args, self.num_edges)
+
+    def chunks(self, size=OUTPUT_CHUNK_SIZE):
+        """ Iterate over edges as (src, dst, weight) array slices """
+        for start in range(0, self.num_edges, size):
+            weight = None if self.weight is None else self.weight[start:start + size]
+            yield self.src[start:start + size], self.dst[start:start + size], weight
+
+    @classmethod
+    def from_networkx(cls, graph):
+        """ Convert a networkx graph, keeping the order of graph.edges() """
+        num_edge = graph.number_of_edges()
+        ends = np.fromiter(chain.from_iterable(graph.edges()), dtype=np.int64, count=2 * num_edge)
+        ends = ends.astype(node_dtype(graph.number_of_nodes()))
+        return cls(graph.number_of_nodes(), ends[0::2], ends[1::2], graph.is_directed())
+
+class EdgeStream(EdgeList):
+    """ A graph whose edges are computed chunk by chunk when iterated, never stored
+
+    edge_range(start, stop) returns (src, dst) arrays of edges start to stop-1.
+    Weights are drawn chunk by chunk too, from the same seeded stream on every pass.
+    """
+    def __init__(self, num_nodes, num_edges, edge_range, directed=False):
+        super(EdgeStream, self).__init__(num_nodes, num_edges, directed)
+        self.edge_range = edge_range
+        self.weight_args = None
+
+    @property
+    def weighted(self):
+        """ Whether edge weights are set """
+        return self.weight_args is not None
+
+    def set_weights(self, args):
+        """ Draw random weights of edges when iterating over them """
+        if args.seed is None:
+            # pin a seed so that every pass draws the same weights
+            args = copy.copy(args)
+            args.seed = int(np.random.SeedSequence().entropy)
+        self.weight_args = args
+
+    def chunks(self, size=OUTPUT_CHUNK_SIZE):
+        """ Iterate over edges as (src, dst, weight) arrays computed on the fly """
+        sampler = None if self.weight_args is None else weight_sampler(self.weight_args)
+        for start in range(0, self.num_edges, size):
+            stop = min(start + size, self.num_edges)
+            src, dst = self.edge_range(start, stop)
+            yield src, dst, None if sampler is None else sampler(stop - start)
+
+def make_rng(seed, *stream):
+    """ Create a numpy random generator from an optional int seed and stream ids """
+    if seed is not None:
+        # numpy seeds must be non-negative, keep negative seeds usable
+        seed &= 0xFFFFFFFFFFFFFFFF
+        if stream:
+            seed = [seed] + list(stream)
+    return np.random.default_rng(seed)
+
+def node_dtype(num_node):
+    """ Smallest numpy int type to hold node ids """
+    return np.int32 if num_node <= np.iinfo(np.int32).max else np.int64
+
+def num_edge_slots(num_node, directed):
+    """ Number of possible edges without self loops """
+    if directed:
+        return num_node * (num_node - 1)
+    return num_node * (num_node - 1) // 2
+
+def row_offset(row, num_node):
+    """ First edge index of each row in the upper triangle of the adjacency matrix """
+    return row * (2 * num_node - row - 1) // 2
+
+def index_to_edge(index, num_node, directed):
+    """ Map edge indices in range [0, num_edge_slots) to (src, dst) node arrays
+
+    Indices follow row-major order of the adjacency matrix without diagonal, and only
+    the upper triangle for undirected graphs, so sorted indices give sorted edges.
+    """
+    if directed:
+        src = index // (num_node - 1)
+        dst = index % (num_node - 1)
+        dst += dst >= src
+    else:
+        # solve row_offset(src) <= index < row_offset(src + 1) for src
+        b = 2.0 * num_node - 1
+        src = np.floor((b - np.sqrt(b * b - 8.0 * index)) / 2).astype(np.int64)
+        # fix up floating point rounding
+        while True:
+            low = row_offset(src, num_node) > index
+            high = row_offset(src + 1, num_node) <= index
+            if not low.any() and not high.any():
+                break
+            src -= low
+            src += high
+        dst = index - row_offset(src, num_node) + src + 1
+    dtype = node_dtype(num_node)
+    return src.astype(dtype), dst.astype(dtype)
+
+def edge_to_index(src, dst, num_node, directed):
+    """ Map (src, dst) node arrays to edge indices, the inverse of index_to_edge """
+    src, dst = src.astype(np.int64), dst.astype(np.int64)
+    if directed:
+        return src * (num_node - 1) + dst - (dst > src)
+    low, high = np.minimum(src, dst), np.maximum(src, dst)
+    return row_offset(low, num_node) + high - low - 1
+
+def skip_index(index, excluded):
+    """ Map indices of a range without the sorted excluded values back to the full range """
+    # the x-th kept value is x plus the number of excluded values up to it
+    return index + np.searchsorted(excluded - np.arange(len(excluded)), index, side='right')
+
+def sorted_unique(values):
+    """ Sort values in place and drop duplicates """
+    values.sort()
+    if len(values) == 0:
+        return values
+    keep = np.empty(len(values), dtype=bool)
+    keep[0] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+def sample_distinct(rng, total, count):
+    """ Sample count distinct integers from range [0, total) in sorted order """
+    if count * 2 > total:
+        # dense case: sample the indices to drop instead
+        keep = np.ones(total, dtype=bool)
+        keep[sample_distinct(rng, total, total - count)] = False
+        return np.flatnonzero(keep)
+    index = sorted_unique(rng.integers(0, total, size=count))
+    # rejection: redraw the number of duplicates until count indices are distinct
+    while len(index) < count:
+        more = rng.integers(0, total, size=count - len(index))
+        index = sorted_unique(np.concatenate((index, more)))
+    return index
+
+def gnm_edge_arrays(num_node, num_edge, seed=None, directed=False, connected=False):
+    """ Random graph with n nodes and m edges, sampled directly as edge arrays """
+    total = num_edge_slots(num_node, directed)
+    if connected:
+        if num_edge < num_node - 1:
+            raise GraphError('a connected graph with %d nodes needs at least %d edges'
+                             % (num_node, num_node - 1))
+        tree = spanning_tree_index(num_node, seed, directed)
+        rng = make_rng(seed, CONNECTED_STREAM)
+        index = sample_distinct(rng, total - len(tree), min(num_edge, total) - len(tree))
+        index = merge_tree_index(tree, index)
+    else:
+        rng = make_rng(seed)
+        index = sample_distinct(rng, total, min(num_edge, total))
+    src, dst = index_to_edge(index, num_node, directed)
+    return EdgeArrays(num_node, src, dst, directed)
+
+def gnp_edge_arrays(num_node, prob, seed=None, directed=False, connected=False):
+    """ Random graph with n nodes and p edge creation probability in O(n + m)
+
+    Batagelj-Brandes geometric skip sampling: the gaps between created edges in the
+    edge index space are geometric, so jump from edge to edge instead of flipping a
+    coin for every node pair.
+    """
+    total = num_edge_slots(num_node, directed)
+    if connected:
+        tree = spanning_tree_index(num_node, seed, directed)
+        index = skip_sample(make_rng(seed, CONNECTED_STREAM), total - len(tree), prob)
+        index = merge_tree_index(tree, index)
+    else:
+        index = skip_sample(make_rng(seed), total, prob)
+    src, dst = index_to_edge(index, num_node, directed)
+    return EdgeArrays(num_node, src, dst, directed)
+
+def spanning_tree_index(num_node, seed, directed):
+    """ Sorted edge indices of the -trn random tree, the spanning tree of --connected graphs
+
+    Directed tree edges point from parents to children, so all nodes are
+    reachable from node 0.
+    """
+    tree = random_tree_edge_arrays(num_node, seed=seed, directed=directed)
+    index = edge_to_index(tree.src, tree.dst, num_node, directed)
+    index.sort()
+    return index
+
+def merge_tree_index(tree, index):
+    """ Sorted edge indices of tree edges and sampled edges of the other indices
+
+    index is sampled from the range without the tree edges, so the edges
+    are distinct without any retry.
+    """
+    index = skip_index(index, tree)
+    merged = np.concatenate((tree, index))
+    merged.sort()
+    return merged
+
+def skip_sample(rng, total, prob):
+    """ Sample each integer of range [0, total) with probability prob in sorted order """
+    if total == 0 or prob <= 0:
+        return np.empty(0, dtype=np.int64)
+    if prob >= 1:
+        return np.arange(total, dtype=np.int64)
+    # draw a bit more than the expected number of edges per chunk
+    expected = total * prob
+    chunk = int(min(expected + 4 * expected ** 0.5 + 16, CHUNK_SIZE))
+    chunks = []
+    last = -1
+    while True:
+        index = last + np.cumsum(rng.geometric(prob, size=chunk))
+        if index[-1] >= total:
+            chunks.append(index[index < total])
+            break
+        chunks.append(index)
+        last = index[-1]
+    return np.concatenate(chunks)
+
+def edge_keys(src, dst, num_node):
+    """ Key of each undirected edge, equal for (u, v) and (v, u) """
+    low = np.minimum(src, dst).astype(np.int64)
+    return low * num_node + np.maximum(src, dst)
+
+def self_loops(src, dst):
+    """ Indices of self loops, compared chunk by chunk """
+    loops = [start + np.flatnonzero(src[start:start + CHUNK_SIZE] == dst[start:start + CHUNK_SIZE])
+             for start in range(0, len(src), CHUNK_SIZE)]
+    return np.concatenate(loops + [np.empty(0, dtype=np.int64)])
+
+class SortedEdgeKeys(object):
+    """ Sorted keys of the edges of a pairing, to find multi-edges and look up edges
+
+    With more than one bucket, edge indices are first scattered to one file per
+    range of low end points. Buckets are key ranges, so each one is sorted on
+    its own into a memory mapped key file, one bucket in memory at a time.
+    """
+    def __init__(self, src, dst, num_node, buckets=1, filename=None):
+        self.num_node = num_node
+        self.buckets = buckets
+        if buckets == 1:
+            keys = edge_keys(src, dst, num_node)
+            order = np.argsort(keys, kind='stable')
+            self.keys = keys[order]
+            self.offsets = [0, len(keys)]
+            # all but the first of equal keys are multi-edges
+            self.duplicates = order[1:][self.keys[1:] == self.keys[:-1]]
+            return
+        names = ['%s.%d' % (filename, b) for b in range(buckets)]
+        files = [open(name, 'wb') for name in names]
+        for start in range(0, len(src), SPILL_CHUNK_SIZE):
+            stop = start + SPILL_CHUNK_SIZE
+            keys = edge_keys(src[start:stop], dst[start:stop], num_node)
+            bucket = self.bucket_of(keys)
+            order = np.argsort(bucket, kind='stable')
+            bounds = np.searchsorted(bucket[order], np.arange(buckets + 1))
+            edges = start + order
+            for b, fout in enumerate(files):
+                fout.write(edges[bounds[b]:bounds[b + 1]].tobytes())
+        for fout in files:
+            fout.close()
+        self.keys = np.memmap(filename, dtype=np.int64, mode='w+', shape=(len(src),))
+        self.offsets = [0]
+        duplicates = []
+        for name in names:
+            edges = np.fromfile(name, dtype=np.int64)
+            os.remove(name)
+            keys = edge_keys(src[edges], dst[edges], num_node)
+            order = np.argsort(keys, kind='stable')
+            keys = keys[order]
+            duplicates.append(edges[order[1:][keys[1:] == keys[:-1]]])
+            start = self.offsets[-1]
+            self.keys[start:start + len(keys)] = keys
+            self.offsets.append(start + len(keys))
+        self.duplicates = np.concatenate(duplicates)
+
+    def bucket_of(self, keys):
+        """ Bucket of edge keys by their low end points """
+        return keys // self.num_node * self.buckets // self.num_node
+
+    def contains(self, keys):
+        """ Whether each key is the key of an edge """
+        found = np.zeros(len(keys), dtype=bool)
+        bucket = self.bucket_of(keys)
+        for b in np.unique(bucket):
+            select = np.flatnonzero(bucket == b)
+            block = self.keys[self.offsets[b]:self.offsets[b + 1]]
+            if len(block) > 0:
+                pos = np.minimum(np.searchsorted(block, keys[select]), len(block) - 1)
+                found[select] = block[pos] == keys[select]
+        return found
+
+def repair_pairing(rng, src, dst, num_node, buckets=1, spill=None):
+    """ Remove self loops and multi-edges of a stub pairing by random edge switches
+
+    A bad edge (a, b) and a random good edge (c, d) are switched to (a, c) and
+    (b, d), or (a, d) and (b, c), if the new edges are neither self loops nor
+    existing edges. Switches keep node degrees. Return the sorted edge keys if
+    all bad edges were repaired within REPAIR_ROUNDS rounds of switches, or None.
+    """
+    index = None
+    for i in range(REPAIR_ROUNDS):
+        old = index
+        index = SortedEdgeKeys(src, dst, num_node, buckets,
+                               None if spill is None else os.path.join(spill, 'keys.%d' % i))
+        if old is not None and buckets > 1:
+            # a mapped file can be removed, it is freed when unmapped
+            os.remove(old.keys.filename)
+        del old
+        bad_edges = np.union1d(self_loops(src, dst), index.duplicates)
+        if len(bad_edges) == 0:
+            return index
+        partners = rng.integers(0, len(src), size=len(bad_edges))
+        flip = rng.integers(0, 2, size=len(bad_edges)).astype(bool)
+        # each edge takes part in at most one switch per round
+        ends = np.concatenate((bad_edges, partners))
+        _, inverse, counts = np.unique(ends, return_inverse=True, return_counts=True)
+        once = counts[inverse] == 1
+        a, b = src[bad_edges], dst[bad_edges]
+        c = np.where(flip, dst[partners], src[partners])
+        d = np.where(flip, src[partners], dst[partners])
+        key1, key2 = edge_keys(a, c, num_node), edge_keys(b, d, num_node)
+        exists1, exists2 = index.contains(key1), index.contains(key2)
+        new_keys = np.concatenate((key1, key2))
+        uniq, counts = np.unique(new_keys, return_counts=True)
+        new_once = np.isin(new_keys, uniq[counts == 1])
+        ok = once[:len(bad_edges)] & once[len(bad_edges):] & ~np.isin(partners, bad_edges) & \
+             (a != c) & (b != d) & ~exists1 & ~exists2 & new_once[:len(key1)] & new_once[len(key1):]
+        src[bad_edges[ok]], dst[bad_edges[ok]] = a[ok], c[ok]
+        src[partners[ok]], dst[partners[ok]] = b[ok], d[ok]
+    return None
+
+def spill_shuffled_stubs(rng, num_node, degree, buckets, filename):
+    """ Shuffle node stubs into a memory mapped file
+
+    Stubs are scattered to random bucket files, then each bucket is shuffled
+    in memory and appended, which is a uniform random permutation.
+    """
+    dtype = node_dtype(num_node)
+    names = ['%s.%d' % (filename, b) for b in range(buckets)]
+    files = [open(name, 'wb') for name in names]
+    step = max(SPILL_CHUNK_SIZE // degree, 1)
+    for start in range(0, num_node, step):
+        stubs = np.repeat(np.arange(start, min(start + step, num_node), dtype=dtype), degree)
+        bucket = rng.integers(0, buckets, size=len(stubs))
+        order = np.argsort(bucket, kind='stable')
+        bounds = np.searchsorted(bucket[order], np.arange(buckets + 1))
+        stubs = stubs[order]
+        for b, fout in enumerate(files):
+            fout.write(stubs[bounds[b]:bounds[b + 1]].tobytes())
+    for fout in files:
+        fout.close()
+    stubs = np.memmap(filename, dtype=dtype, mode='w+', shape=(num_node * degree,))
+    start = 0
+    for name in names:
+        block = np.fromfile(name, dtype=dtype)
+        os.remove(name)
+        rng.shuffle(block)
+        stubs[start:start + len(block)] = block
+        start += len(block)
+    return stubs
+
+def regular_edge_arrays(num_node, degree, seed=None, buckets=1, spill_dir=None):
+    """ Random d-regular graph with n nodes by a configuration model
+
+    Node stubs are shuffled and paired up, then self loops and multi-edges are
+    repaired by edge switches. If repair gets stuck, stubs are paired again.
+    With more than one bucket, stubs and edge keys are spilled to memory mapped
+    files in a temporary directory, and edges are streamed from the key file.
+    """
+    if (num_node * degree) % 2 != 0:
+        raise GraphError('n * d must be even')
+    if not 0 <= degree < num_node:
+        raise GraphError('the 0 <= d < n inequality must be satisfied')
+    if degree * 2 > num_node:
+        # switches rarely succeed in dense graphs, take the complement of a sparse one
+        sparse = regular_edge_arrays(num_node, num_node - 1 - degree, seed)
+        keep = np.ones(num_edge_slots(num_node, False), dtype=bool)
+        keep[row_offset(sparse.src.astype(np.int64), num_node) + sparse.dst - sparse.src - 1] = False
+        src, dst = index_to_edge(np.flatnonzero(keep), num_node, False)
+        return EdgeArrays(num_node, src, dst)
+    rng = make_rng(seed)
+    dtype = node_dtype(num_node)
+    spill = None
+    if buckets > 1:
+        spill = tempfile.TemporaryDirectory(prefix='gen_graph_', dir=spill_dir)
+    for i in range(MAX_PAIRINGS):
+        if spill is None:
+            stubs = np.repeat(np.arange(num_node, dtype=dtype), degree)
+            rng.shuffle(stubs)
+            src, dst = stubs[0::2].copy(), stubs[1::2].copy()
+        else:
+            if i > 0:
+                os.remove(os.path.join(spill.name, 'stubs.%d' % (i - 1)))
+            stubs = spill_shuffled_stubs(rng, num_node, degree, buckets,
+                                         os.path.join(spill.name, 'stubs.%d' % i))
+            src, dst = stubs[0::2], stubs[1::2]
+        del stubs
+        index = repair_pairing(rng, src, dst, num_node, buckets, spill and spill.name)
+        if index is not None:
+            break
+    else:
+        raise GraphError('failed to generate a %d-regular graph of %d nodes' % (degree, num_node))
+    # output edges (u, v) with u < v in sorted order
+    keys = index.keys
+    if spill is None:
+        return EdgeArrays(num_node, (keys // num_node).astype(dtype),
+                          (keys % num_node).astype(dtype))
+    def edge_range(start, stop):
+        """ Edges start to stop-1 read from the key file, which lives as long as spill """
+        block = keys[start:stop]
+        return (block // num_node).astype(dtype), (block % num_node).astype(dtype)
+    edge_range.spill = spill
+    return EdgeStream(num_node, len(keys), edge_range)
+
+def decode_prufer(seq, num_node):
+    """ Parent of each node in the tree of a Prufer sequence rooted at node n-1
+
+    Linear time decoding: a pointer scans for the smallest leaf, and a node
+    that becomes a leaf below the pointer is removed right away. Memoryviews
+    of numpy arrays keep the loop on plain python ints without copies.
+    """
+    degree = np.bincount(seq, minlength=num_node).astype(seq.dtype)
+    degree += 1
+    parent = np.empty(num_node, dtype=seq.dtype)
+    deg = memoryview(degree)
+    par = memoryview(parent)
+    ptr = 0
+    while deg[ptr] != 1:
+        ptr += 1
+    leaf = ptr
+    for node in memoryview(seq):
+        par[leaf] = node
+        deg[node] -= 1
+        if node < ptr and deg[node] == 1:
+            leaf = node
+        else:
+            ptr += 1
+            while deg[ptr] != 1:
+                ptr += 1
+            leaf = ptr
+    par[leaf] = num_node - 1
+    return parent
+
+def random_tree_edge_arrays(num_node, seed=None, directed=False):
+    """ Uniform random labeled tree from a random Prufer sequence
+
+    Edges are (parent, child) for child 1 to n-1, rooted at node 0.
+    """
+    if num_node == 0:
+        raise GraphError('the null graph is not a tree')
+    dtype = node_dtype(num_node)
+    if num_node == 1:
+        empty = np.zeros(0, dtype=dtype)
+        return EdgeArrays(num_node, empty, empty.copy(), directed)
+    rng = make_rng(seed)
+    seq = rng.integers(0, num_node, size=num_node - 2, dtype=dtype)
+    parent = decode_prufer(seq, num_node)
+    del seq
+    # relabel x as n-1-x so that the root is node 0
+    src = parent[num_node - 2::-1]
+    np.subtract(num_node - 1, src, out=src)
+    return EdgeArrays(num_node, src, np.arange(1, num_node, dtype=dtype), directed)
+
+def resolve_targets(ptr, degree, edges):
+    """ Targets of Barabasi-Albert edges from slots of the repeated-nodes array
+
+    Slots 2e and 2e+1 hold the source and target of edge e. The first m edges
+    are the initial star (i+1, 0), later edges come from node m+1+k//m. ptr[k]
+    is the slot that new edge k copies its target from. A source slot is known,
+    and a target slot points to an earlier edge, so chains of the new edges
+    are followed all at once until every edge reaches a source slot or the
+    star center.
+    """
+    target = np.empty(len(edges), dtype=np.int64)
+    slot = ptr[edges]
+    pending = np.arange(len(edges))
+    while len(pending) > 0:
+        edge = slot[pending] >> 1
+        odd = (slot[pending] & 1).astype(bool)
+        star = edge < degree
+        # source slots: star leaves and new nodes
+        done = ~odd
+        target[pending[done]] = np.where(star[done], edge[done] + 1,
+                                         degree + 1 + (edge[done] - degree) // degree)
+        # target slots of the star are its center
+        target[pending[odd & star]] = 0
+        follow = odd & ~star
+        pending = pending[follow]
+        slot[pending] = ptr[edge[follow] - degree]
+    return target
+
+def copied_edges(ptr, degree, edges):
+    """ New edges whose ptr is the target slot of each of edges, or -1 """
+    edge = ptr[edges] >> 1
+    return np.where((ptr[edges] & 1).astype(bool) & (edge >= degree), edge - degree, -1)
+
+def copy_rows(ptr, degree):
+    """ New edges copying the target of each new edge, as compressed sparse rows """
+    copied = copied_edges(ptr, degree, np.arange(len(ptr)))
+    copies = np.flatnonzero(copied >= 0)
+    copies = copies[np.argsort(copied[copies])]
+    indptr = np.zeros(len(ptr) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(copied[copies], minlength=len(ptr)), out=indptr[1:])
+    return indptr, copies
+
+def csr_gather(indptr, values, rows):
+    """ Concatenated values of rows of a compressed sparse row array """
+    start, count = indptr[rows], indptr[rows + 1] - indptr[rows]
+    offset = np.repeat(start - np.cumsum(count) + count, count)
+    return values[offset + np.arange(len(offset))]
+
+def barabasi_albert_edge_arrays(num_node, degree, seed=None):
+    """ Barabasi-Albert graph by a vectorized repeated-nodes sampler, same model as networkx
+
+    Starting from a star of m+1 nodes, each new node picks m distinct targets
+    with probability proportional to degree, by copying the node of a uniform
+    slot of the repeated-nodes array before its own edges. Duplicate targets
+    of a node are drawn again until all targets are distinct. After the first
+    round, only edges that copy a redrawn target, directly or through a chain,
+    are resolved again, and only their nodes are checked.
+    """
+    if degree < 1 or degree >= num_node:
+        raise GraphError('Barabasi-Albert network must have m >= 1 and m < n, m = %d, n = %d'
+                         % (degree, num_node))
+    rng = make_rng(seed)
+    dtype = node_dtype(num_node)
+    num_new = (num_node - degree - 1) * degree
+    # each new edge copies from slots before the first edge of its node
+    node = np.arange(num_new, dtype=np.int64) // degree
+    limit = 2 * (degree + node * degree)
+    ptr = rng.integers(0, limit)
+    target = resolve_targets(ptr, degree, np.arange(num_new))
+    indptr, copies = copy_rows(ptr, degree)
+    # copies by redrawn ptr are not in the rows, and stale rows only add edges to resolve
+    extra_copied, extra_copies = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    nodes = np.arange(num_node - degree - 1)
+    while True:
+        # a row of the edges of each node to check
+        rows = nodes[:, None] * degree + np.arange(degree)
+        order = np.argsort(target[rows], axis=1, kind='stable')
+        ordered = np.take_along_axis(target[rows], order, axis=1)
+        # keep the first of equal targets of a node, draw the others again
+        again = np.take_along_axis(rows, order, axis=1)[:, 1:][ordered[:, 1:] == ordered[:, :-1]]
+        if len(again) == 0:
+            break
+        ptr[again] = rng.integers(0, limit[again])
+        copied = copied_edges(ptr, degree, again)
+        extra_copied = np.concatenate((extra_copied, copied[copied >= 0]))
+        extra_copies = np.concatenate((extra_copies, again[copied >= 0]))
+        if len(extra_copies) > len(copies) // 16:
+            indptr, copies = copy_rows(ptr, degree)
+            extra_copied, extra_copies = extra_copied[:0], extra_copies[:0]
+        # redrawn edges and the edges copying them
+        affected = np.zeros(num_new, dtype=bool)
+        frontier = again
+        while len(frontier) > 0:
+            affected[frontier] = True
+            frontier = np.concatenate((csr_gather(indptr, copies, frontier),
+                                       extra_copies[np.isin(extra_copied, frontier)]))
+            frontier = np.unique(frontier[~affected[frontier]])
+        edges = np.flatnonzero(affected)
+        target[edges] = resolve_targets(ptr, degree, edges)
+        nodes = np.unique(node[edges])
+    src = np.concatenate((np.zeros(degree, dtype=dtype),
+                          (degree + 1 + node).astype(dtype)))
+    dst = np.concatenate((np.arange(1, degree + 1, dtype=dtype), target.astype(dtype)))
+    return EdgeArrays(num_node, src, dst)
+
+def power_law_weights(num_node, gamma, avg_degree):
+    """ Expected degrees w_i proportional to (i+1)^(-1/(gamma-1)) with mean avg_degree """
+    if gamma <= 1:
+        raise GraphError('gamma must be greater than 1')
+    weight = np.arange(1, num_node + 1, dtype=np.float64) ** (-1 / (gamma - 1))
+    return weight * (avg_degree * num_node / weight.sum())
+
+def chung_lu_edge_arrays(num_node, gamma, avg_degree, seed=None, directed=False):
+    """ Chung-Lu graph with power-law expected degrees, sampled in O(m) batches
+
+    A Poisson number of edges is drawn with both end points chosen by inverse
+    CDF of the expected degrees, then self loops and multi-edges are dropped.
+    Edge (u, v) is kept with probability 1 - exp(-w_u w_v / S), close to the
+    min(w_u w_v / S, 1) of networkx expected_degree_graph.
+    """
+    if num_node == 0:
+        empty = np.zeros(0, dtype=np.int32)
+        return EdgeArrays(0, empty, empty.copy(), directed)
+    if avg_degree > num_node - 1:
+        raise GraphError('avgdeg must be at most n-1')
+    rng = make_rng(seed)
+    dtype = node_dtype(num_node)
+    weight = power_law_weights(num_node, gamma, avg_degree)
+    cdf = np.cumsum(weight)
+    total = cdf[-1]
+    if total == 0:
+        empty = np.zeros(0, dtype=dtype)
+        return EdgeArrays(num_node, empty, empty.copy(), directed)
+    cdf /= total
+    # each undirected pair is drawn in both orders
+    num_draw = rng.poisson(total if directed else total / 2)
+    keys = []
+    for start in range(0, num_draw, CHUNK_SIZE):
+        count = min(CHUNK_SIZE, num_draw - start)
+        src = np.minimum(np.searchsorted(cdf, rng.random(count), side='right'), num_node - 1)
+        dst = np.minimum(np.searchsorted(cdf, rng.random(count), side='right'), num_node - 1)
+        loop = src == dst
+        src, dst = src[~loop], dst[~loop]
+        if not directed:
+            src, dst = np.minimum(src, dst), np.maximum(src, dst)
+        keys.append(sorted_unique(src * num_node + dst))
+    keys = sorted_unique(np.concatenate(keys + [np.empty(0, dtype=np.int64)]))
+    return EdgeArrays(num_node, (keys // num_node).astype(dtype),
+                      (keys % num_node).astype(dtype), directed)
+
+def watts_strogatz_edge_arrays(num_node, k, prob, seed=None):
+    """ Watts-Strogatz small-world graph with all edges rewired at once
+
+    Each node is joined to its k//2 nearest ring neighbors on each side, then
+    every lattice edge (u, v) is rewired to (u, w) of a uniform w with
+    probability p. Rewired edges that are self loops or multi-edges are drawn
+    again, and keep the lattice edge after REWIRE_ROUNDS tries, like networkx
+    skips rewiring of a node joined to all others.
+    """
+    if k > num_node:
+        raise GraphError('k>n, choose smaller k or larger n')
+    if k == num_node:
+        # the graph is complete, not Watts-Strogatz
+        return complete_edge_stream(num_node)
+    rng = make_rng(seed)
+    dtype = node_dtype(num_node)
+    half = k // 2
+    node = np.tile(np.arange(num_node, dtype=np.int64), half)
+    near = (node + np.repeat(np.arange(1, half + 1), num_node)) % num_node
+    # neighbors j and n-j are the same edge on a small ring
+    keys = np.minimum(node, near) * num_node + np.maximum(node, near)
+    first = np.sort(np.unique(keys, return_index=True)[1])
+    node, near = node[first], near[first]
+    far = near.copy()
+    fixed = rng.random(len(node)) >= prob
+    bad = np.flatnonzero(~fixed)
+    rounds = 0
+    while len(bad) > 0:
+        if rounds < REWIRE_ROUNDS:
+            far[bad] = rng.integers(0, num_node, size=len(bad))
+        else:
+            far[bad] = near[bad]
+            fixed[bad] = True
+        rounds += 1
+        keys = np.minimum(node, far) * num_node + np.maximum(node, far)
+        # among equal edges, the fixed one comes first and is kept
+        order = np.lexsort((~fixed, keys))
+        dup = np.zeros(len(keys), dtype=bool)
+        dup[order[1:]] = keys[order[1:]] == keys[order[:-1]]
+        bad = np.flatnonzero(dup | (node == far))
+    keys = np.sort(np.minimum(node, far) * num_node + np.maximum(node, far))
+    return EdgeArrays(num_node, (keys // num_node).astype(dtype), (keys % num_node).astype(dtype))
+
+def edge_distances(pos, src, dst):
+    """ Euclidean distances of edges, rounded to DISTANCE_DIGITS decimal digits """
+    return np.round(np.hypot(*(pos[src] - pos[dst]).T), DISTANCE_DIGITS)
+
+def cell_pairs(begin, length):
+    """ Pairs (i, j) of every i and j in [begin[i], begin[i] + length[i]) """
+    first = np.repeat(np.arange(len(begin)), length)
+    second = np.arange(len(first)) - np.repeat(np.cumsum(length) - length - begin, length)
+    return first, second
+
+def geometric_edge_arrays(num_node, radius, seed=None, distance=False):
+    """ Random geometric graph of uniform nodes in the unit square, found by a cell grid
+
+    Nodes are sorted by cells at least radius wide, so neighbors of a node are
+    in its own cell or the 8 around it. Only the own cell and 4 of the others
+    are checked to find each pair once. Node pairs at most radius apart are
+    edges, same as networkx random_geometric_graph, and their Euclidean
+    distances are the weights if distance is True.
+    """
+    rng = make_rng(seed)
+    dtype = node_dtype(num_node)
+    pos = rng.random((num_node, 2))
+    # about one node per cell when the radius is small
+    side = int(num_node ** 0.5) + 1
+    if radius > 0:
+        side = max(1, min(side, int(1 / radius)))
+    cell = np.minimum((pos * side).astype(np.int64), side - 1)
+    order = np.argsort(cell[:, 0] * side + cell[:, 1], kind='stable')
+    cell = cell[order]
+    count = np.bincount(cell[:, 0] * side + cell[:, 1], minlength=side * side)
+    start = np.cumsum(count) - count
+    index = np.arange(num_node)
+    srcs, dsts = [np.empty(0, dtype=np.int64)], [np.empty(0, dtype=np.int64)]
+    for dx, dy in [(0, 0), (1, -1), (1, 0), (1, 1), (0, 1)]:
+        x, y = cell[:, 0] + dx, cell[:, 1] + dy
+        valid = (x < side) & (y >= 0) & (y < side)
+        other = np.where(valid, x * side + y, 0)
+        begin = start[other]
+        length = np.where(valid, count[other], 0)
+        if dx == 0 and dy == 0:
+            # later nodes of the own cell
+            length = begin + length - index - 1
+            begin = index + 1
+        # split nodes so that about CHUNK_SIZE pairs are checked at once
+        total = np.cumsum(length)
+        bounds = np.searchsorted(total, np.arange(CHUNK_SIZE, total[-1] if num_node else 0,
+                                                  CHUNK_SIZE))
+        for lo, hi in zip(chain([0], bounds), chain(bounds, [num_node])):
+            first, second = cell_pairs(begin[lo:hi], length[lo:hi])
+            first += lo
+            src, dst = order[first], order[second]
+            near = ((pos[src] - pos[dst]) ** 2).sum(axis=1) <= radius * radius
+            srcs.append(src[near])
+            dsts.append(dst[near])
+    src, dst = np.concatenate(srcs), np.concatenate(dsts)
+    keys = np.minimum(src, dst) * num_node + np.maximum(src, dst)
+    keys.sort()
+    src, dst = keys // num_node, keys % num_node
+    graph = EdgeArrays(num_node, src.astype(dtype), dst.astype(dtype))
+    if distance:
+        graph.weight = edge_distances(pos, src, dst)
+    return graph
+
+def complete_edge_stream(num_node, directed=False):
+    """ Complete graph in the edge order of networkx, edges are computed lazily """
+    def edge_range(start, stop):
+        """ Edges with index start to stop-1 in lexicographic order """
+        return index_to_edge(np.arange(start, stop, dtype=np.int64), num_node, directed)
+    return EdgeStream(num_node, num_edge_slots(num_node, directed), edge_range, directed)
+
+def cycle_edge_arrays(num_node, directed=False):
+    """ Cycle graph in the edge order of networkx """
+    if num_node == 0:
+        raise GraphError('n must be positive')
+    dtype = node_dtype(num_node)
+    if num_node == 1:
+        src = np.zeros(1, dtype=dtype)
+        dst = np.zeros(1, dtype=dtype)
+    elif directed:
+        src = np.arange(num_node, dtype=dtype)
+        dst = np.roll(src, -1)
+    elif num_node == 2:
+        src = np.array([0], dtype=dtype)
+        dst = np.array([1], dtype=dtype)
+    else:
+        # node 0 lists both of its neighbors first: (0,1), (0,n-1), (1,2), ...
+        src = np.concatenate([[0, 0], np.arange(1, num_node - 1)]).astype(dtype)
+        dst = np.concatenate([[1, num_node - 1], np.arange(2, num_node)]).astype(dtype)
+    return EdgeArrays(num_node, src, dst, directed)
+
+def path_edge_arrays(num_node, directed=False):
+    """ Path graph in the edge order of networkx """
+    nodes = np.arange(num_node, dtype=node_dtype(num_node))
+    return EdgeArrays(num_node, nodes[:-1], nodes[1:], directed)
+
+def rary_tree_edge_arrays(branch, num_node, directed=False):
+    """ Full r-ary tree in breadth-first order, same as networkx full_rary_tree """
+    dtype = node_dtype(num_node)
+    if branch == 0 or num_node <= 1:
+        empty = np.zeros(0, dtype=dtype)
+        return EdgeArrays(num_node, empty, empty.copy(), directed)
+    child = np.arange(1, num_node, dtype=np.int64)
+    parent = (child - 1) // branch
+    return EdgeArrays(num_node, parent.astype(dtype), child.astype(dtype), directed)
+
+def balanced_tree_edge_arrays(branch, height, directed=False):
+    """ Perfectly balanced r-ary tree of height h, same as networkx balanced_tree """
+    if branch == 1:
+        num_node = height + 1
+    else:
+        num_node = (1 - branch ** (height + 1)) // (1 - branch)
+    return rary_tree_edge_arrays(branch, num_node, directed)
+
+def gen_graph_numpy(args):
+    """ Generate a graph as edge arrays without networkx """
+    graph = None
+    strategy, count = memory_strategy(args)
+    if strategy == 'partitions':
+        args = copy.copy(args)
+        args.partitions = count
+        graph = PartitionStream(args)
+    elif args.partitions > 1:
+        graph = gen_partitions(args)
+    elif args.grnm:
+        graph = gnm_edge_arrays(args.n, args.m, seed=args.seed, directed=args.directed,
+                                connected=args.connected)
+    elif args.grnp:
+        graph = gnp_edge_arrays(args.n, args.p, seed=args.seed, directed=args.directed,
+                                connected=args.connected)
+    elif args.grnd:
+        graph = regular_edge_arrays(args.n, args.d, seed=args.seed, buckets=count,
+                                    spill_dir=args.spill_dir)
+    elif args.trn:
+        graph = random_tree_edge_arrays(args.n, seed=args.seed, directed=args.directed)
+    elif args.gba:
+        graph = barabasi_albert_edge_arrays(args.n, args.m, seed=args.seed)
+    elif args.gpl:
+        graph = chung_lu_edge_arrays(args.n, args.gamma, args.avgdeg, seed=args.seed,
+                                     directed=args.directed)
+    elif args.gws:
+        graph = watts_strogatz_edge_arrays(args.n, args.k, args.p, seed=args.seed)
+    elif args.grg:
+        graph = geometric_edge_arrays(args.n, args.r, seed=args.seed,
+                                      distance=args.distance_weights)
+    elif args.gkn:
+        graph = complete_edge_stream(args.n, directed=args.directed)
+    elif args.gcn:
+        graph = cycle_edge_arrays(args.n, directed=args.directed)
+    elif args.gpn:
+        graph = path_edge_arrays(args.n, directed=args.directed)
+    elif args.tch:
+        graph = balanced_tree_edge_arrays(args.c, args.h, directed=args.directed)
+    elif args.tcn:
+        graph = rary_tree_edge_arrays(args.c, args.n, directed=args.directed)
+    return graph
+
+def random_weight(args):
+    """ Draw one random edge weight from the python random module """
+    weight = 0
+    if args.w == 'int':
+        weight = random.randint(int(args.wmin), int(args.wmax))
+    elif args.w == 'float':
+        weight = random.uniform(args.wmin, args.wmax)
+        # keep 2 decimal digits
+        weight = int(weight * 100) / 100
+    return weight
+
+def weight_sampler(args, partition=None):
+    """ Create a function that draws random weights of the next count edges """
+    if args.legacy_weights:
+        if args.seed is not None:
+            random.seed(args.seed)
+        return lambda count: np.array([random_weight(args) for _ in range(count)])
+    if partition is None:
+        rng = make_rng(args.seed, WEIGHT_STREAM)
+    else:
+        rng = make_rng(args.seed, WEIGHT_STREAM, partition)
+    def sampler(count):
+        """ Draw random weights of count edges in one batch """
+        if args.w == 'int':
+            return rng.integers(int(args.wmin), int(args.wmax), size=count, endpoint=True)
+        weight = rng.uniform(args.wmin, args.wmax, size=count)
+        # keep 2 decimal digits
+        return np.trunc(weight * 100) / 100
+    return sampler
+
+def random_weights(args, num_edge, partition=None):
+    """ Draw random edge weights in one batch from a numpy random generator """
+    return weight_sampler(args, partition)(num_edge)
+
+def gen_graph_networkx(nx, args):
+    """ Generate a networkx graph, networkx errors are raised as GraphError """
     graph = None
     ref = nx.DiGraph if args.directed else None
     try:
@@ -160,84 +1386,1317 @@ def gen_graph(nx, args):
         elif args.gpn:
             graph = nx.path_graph(args.n, create_using=ref)
         elif args.trn:
-            graph = nx.random_tree(args.n, seed=args.seed)
+            if hasattr(nx, 'random_tree'):
+                graph = nx.random_tree(args.n, seed=args.seed)
+            else:
+                # removed in networkx 3.4
+                return random_tree_edge_arrays(args.n, seed=args.seed)
         elif args.tch:
             graph = nx.balanced_tree(args.c, args.h, create_using=ref)
         elif args.tcn:
             graph = nx.full_rary_tree(args.c, args.n, create_using=ref)
+        elif args.gba:
+            graph = nx.barabasi_albert_graph(args.n, args.m, seed=args.seed)
+        elif args.gpl:
+            weight = power_law_weights(args.n, args.gamma, args.avgdeg).tolist()
+            graph = nx.expected_degree_graph(weight, seed=args.seed, selfloops=False)
+        elif args.gws:
+            graph = nx.watts_strogatz_graph(args.n, args.k, args.p, seed=args.seed)
+        elif args.grg:
+            graph = nx.random_geometric_graph(args.n, args.r, seed=args.seed)
     except nx.NetworkXError as err:
-        print('Error: %s' % err)
+        raise GraphError(str(err))
     except nx.NetworkXPointlessConcept as err:
-        print('Error: %s' % err)
+        raise GraphError(str(err))
+    if graph is None:
+        return None
+    edges = EdgeArrays.from_networkx(graph)
+    if args.grg and args.distance_weights:
+        pos = np.array([graph.nodes[i]['pos'] for i in range(args.n)]).reshape(args.n, 2)
+        edges.weight = edge_distances(pos, edges.src, edges.dst)
+    return edges
+
+def build_graph(nx, args):
+    """ Generate a graph with random weights, nx is only used by the networkx engine """
+    with stage(args, 'generate'):
+        if args.engine == 'numpy':
+            graph = gen_graph_numpy(args)
+        else:
+            graph = gen_graph_networkx(nx, args)
 
     # Generate random weights
-    if args.w is not None:
-        if args.seed is not None:
-            random.seed(args.seed)
-        for edge in graph.edges():
-            weight = 0
-            if args.w == 'int':
-                weight = random.randint(int(args.wmin), int(args.wmax))
-            elif args.w == 'float':
-                weight = random.uniform(args.wmin, args.wmax)
-                # keep 2 decimal digits
-                weight = int(weight * 100) / 100
-            graph[edge[0]][edge[1]]['weight'] = weight
+    if graph is not None and args.w is not None and not graph.weighted:
+        with stage(args, 'weights'):
+            graph.set_weights(args)
 
     return graph
 
+def gen_graph(nx, args):
+    """ Generate a graph based on command line arguments, print an error if it fails """
+    try:
+        return build_graph(nx, args)
+    except GraphError as err:
+        print('Error: %s' % err)
+        return None
+
+def peak_rss_kb():
+    """ Peak resident set size of this process in KiB, or None if unknown """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KiB
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+class Stats(object):
+    """ Wall time, CPU time and peak memory of the stages of a run, for --stats
+
+    Lazily generated edges, e.g. of -gkn, are generated in the output stage.
+    CPU time is of this process only, not of worker processes.
+    """
+    def __init__(self):
+        self.stages = []
+        self.num_edges = None
+        self.bytes_written = None
+
+    def add(self, name, wall, cpu=None):
+        """ Record a stage that already ran """
+        self.stages.append({'stage': name, 'wall_seconds': wall, 'cpu_seconds': cpu,
+                            'peak_rss_kb': peak_rss_kb()})
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """ Time a stage of the run """
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def summary(self):
+        """ Stages, edges/sec of generation and output stages, and bytes written """
+        seconds = sum(s['wall_seconds'] for s in self.stages
+                      if s['stage'] in ['generate', 'weights', 'output', 'generate and output',
+                                        'cache'])
+        edges_per_sec = None
+        if self.num_edges is not None and seconds > 0:
+            edges_per_sec = self.num_edges / seconds
+        return {'stages': self.stages, 'num_edges': self.num_edges,
+                'edges_per_sec': edges_per_sec, 'bytes_written': self.bytes_written}
+
+    def report(self, filename):
+        """ Print the summary to stderr, or write it as JSON if filename is not '-' """
+        summary = self.summary()
+        if filename != '-':
+            with open(filename, 'w') as fout:
+                json.dump(summary, fout, indent=2)
+            return
+        def fmt(value, spec):
+            """ Format a number, or '-' if unknown """
+            return '-' if value is None else spec % value
+        lines = ['%-16s %9s %9s %10s' % ('stage', 'wall s', 'cpu s', 'peak MB')]
+        for s in summary['stages']:
+            peak = None if s['peak_rss_kb'] is None else s['peak_rss_kb'] / 1024
+            lines.append('%-16s %9.3f %9s %10s' % (s['stage'], s['wall_seconds'],
+                                                   fmt(s['cpu_seconds'], '%.3f'),
+                                                   fmt(peak, '%.1f')))
+        lines.append('edges %s, edges/sec %s, bytes written %s' % (
+            fmt(summary['num_edges'], '%d'), fmt(summary['edges_per_sec'], '%.0f'),
+            fmt(summary['bytes_written'], '%d')))
+        print('\n'.join(lines), file=sys.stderr)
+
+def stage(args, name):
+    """ Context manager timing a stage for --stats, or doing nothing """
+    stats = getattr(args, 'run_stats', None)
+    return contextlib.nullcontext() if stats is None else stats.stage(name)
+
+def load_networkx(args):
+    """ Import networkx if the engine or --visualize needs it, otherwise return None """
+    if args.engine != 'networkx' and not args.visualize:
+        return None
+    import networkx as nx
+    return nx
+
 def show_graph(nx, graph):
     """ Visualize the graph """
     import matplotlib.pyplot as plt
+    graph = graph.to_networkx(nx)
     pos = nx.spring_layout(graph)
     nx.draw(graph, pos=pos, with_labels=True)
     labels = nx.get_edge_attributes(graph, 'weight')
     nx.draw_networkx_edge_labels(graph, pos, edge_labels=labels)
     plt.show()
 
-def output_edge_list(nx, graph, args):
-    """ Output num node, num edge and edge list """
-    one_based = args.one_based
-    filename = args.output
+def format_edge_chunk(src, dst, weight, base):
+    """ Format a chunk of edges as lines of text """
+    src = (src + base).tolist()
+    dst = (dst + base).tolist()
+    if weight is None:
+        return ''.join(['%d %d\n' % edge for edge in zip(src, dst)])
+    # format weights with str() like print does
+    return ''.join(['%d %d %s\n' % edge for edge in zip(src, dst, weight.tolist())])
+
+def text_encoder(graph, args):
+    """ Header of the text format and a function formatting a chunk of edges """
+    base = 1 if args.one_based else 0
+    # the number of edges is known before generating the edge list
+    header = '%d %d\n' % (graph.number_of_nodes(), graph.number_of_edges())
+    return header, lambda src, dst, weight: format_edge_chunk(src, dst, weight, base)
+
+def write_edge_list(fout, graph, args):
+    """ Write num node, num edge and edge list to a text stream chunk by chunk
+
+    Return the number of characters written, which are all ASCII.
+    """
+    text, encode = text_encoder(graph, args)
+    fout.write(text)
+    written = len(text)
+    for src, dst, weight in graph.chunks():
+        text = encode(src, dst, weight)
+        fout.write(text)
+        written += len(text)
+    return written
+
+def edge_array_dtype(graph, args):
+    """ Element type of the (m,2) or (m,3) npy edge array """
+    if args.w == 'float':
+        return np.dtype('<f8')
+    if args.w == 'int':
+        return np.dtype('<i8')
+    return np.dtype(node_dtype(graph.number_of_nodes() + 1)).newbyteorder('<')
+
+def npy_encoder(graph, args):
+    """ Header of an (m,2) or (m,3) npy array and a function converting a chunk to its rows """
+    base = 1 if args.one_based else 0
+    weighted = args.w is not None
+    dtype = edge_array_dtype(graph, args)
+    header = io.BytesIO()
+    np.lib.format.write_array_header_1_0(header, {
+        'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False,
+        'shape': (graph.number_of_edges(), 3 if weighted else 2)})
+    def encode(src, dst, weight):
+        """ Rows of a chunk of edges as bytes """
+        columns = [src + base, dst + base] + ([weight] if weighted else [])
+        return np.column_stack(columns).astype(dtype).tobytes()
+    return header.getvalue(), encode
+
+def write_npy(fout, graph, args):
+    """ Write edges as an (m,2) or (m,3) npy array chunk by chunk """
+    header, encode = npy_encoder(graph, args)
+    fout.write(header)
+    for src, dst, weight in graph.chunks():
+        fout.write(encode(src, dst, weight))
+
+def bin_record_dtype(id_bytes, weight_type):
+    """ Record type of an edge in the bin format """
+    fields = [('src', '<i%d' % id_bytes), ('dst', '<i%d' % id_bytes)]
+    if weight_type == BIN_WEIGHT_TYPES['int']:
+        fields.append(('weight', '<i8'))
+    elif weight_type == BIN_WEIGHT_TYPES['float']:
+        fields.append(('weight', '<f8'))
+    return np.dtype(fields)
+
+def bin_encoder(graph, args):
+    """ Small header of the bin format and a function converting a chunk to raw records """
+    base = 1 if args.one_based else 0
     weighted = args.w is not None
+    id_bytes = np.dtype(node_dtype(graph.number_of_nodes() + 1)).itemsize
+    weight_type = BIN_WEIGHT_TYPES[args.w]
+    flags = (BIN_FLAG_DIRECTED if graph.is_directed() else 0) | \
+            (BIN_FLAG_ONE_BASED if args.one_based else 0)
+    header = BIN_HEADER.pack(BIN_MAGIC, 1, id_bytes, weight_type, flags,
+                             graph.number_of_nodes(), graph.number_of_edges())
+    dtype = bin_record_dtype(id_bytes, weight_type)
+    def encode(src, dst, weight):
+        """ Little-endian records of a chunk of edges as bytes """
+        records = np.empty(len(src), dtype=dtype)
+        records['src'] = src + base
+        records['dst'] = dst + base
+        if weighted:
+            records['weight'] = weight
+        return records.tobytes()
+    return header, encode
 
+def write_bin(fout, graph, args):
+    """ Write a small header and raw little-endian edge records chunk by chunk """
+    header, encode = bin_encoder(graph, args)
+    fout.write(header)
+    for src, dst, weight in graph.chunks():
+        fout.write(encode(src, dst, weight))
+
+def write_npz_csr(fout, graph, args):
+    """ Write edges in compressed sparse row arrays indptr, indices and weights """
+    weighted = args.w is not None
     num_node = graph.number_of_nodes()
-    num_edge = graph.number_of_edges()
-    base = 1 if one_based else 0
+    chunks = list(graph.chunks())
+    src = np.concatenate([chunk[0] for chunk in chunks] + [np.empty(0, dtype=np.int32)])
+    dst = np.concatenate([chunk[1] for chunk in chunks] + [np.empty(0, dtype=np.int32)])
     if weighted:
-        edge_list = [[edge[0] + base, edge[1] + base, graph[edge[0]][edge[1]]['weight']] for edge in graph.edges()]
+        weight = np.concatenate([chunk[2] for chunk in chunks]) if chunks else np.empty(0)
+    # stable sort keeps the generated order of edges from the same node
+    order = np.argsort(src, kind='stable')
+    indptr = np.zeros(num_node + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=num_node), out=indptr[1:])
+    arrays = {'indptr': indptr,
+              'indices': dst[order] + (1 if args.one_based else 0),
+              'num_nodes': np.array(num_node),
+              'directed': np.array(graph.is_directed()),
+              'one_based': np.array(args.one_based)}
+    if weighted:
+        arrays['weights'] = weight[order]
+    np.savez(fout, **arrays)
+
+def compression_ext(filename):
+    """ Compressed file extension of an output file name, or '' if not compressed """
+    ext = os.path.splitext(filename or '')[1]
+    return ext if ext in COMPRESSION_MODULES else ''
+
+def block_compressor(ext, level):
+    """ Function compressing a block of bytes into a complete gzip member or zstd/lz4 frame """
+    if level is None:
+        level = COMPRESSION_LEVELS[ext][1]
+    if ext == '.gz':
+        import gzip
+        # mtime 0 keeps outputs of the same seed identical
+        return lambda block: gzip.compress(block, compresslevel=level, mtime=0)
+    if ext == '.zst':
+        import zstandard
+        # compressor objects are not thread safe, create one per block
+        return lambda block: zstandard.ZstdCompressor(level=level).compress(block)
+    import lz4.frame
+    return lambda block: lz4.frame.compress(block, compression_level=level)
+
+class CompressedWriter(object):
+    """ Output file compressing blocks in a pool of threads
+
+    Concatenated gzip members and zstd/lz4 frames are valid compressed files,
+    so blocks are compressed independently while the next blocks are generated.
+    The codecs release the GIL, and compressed blocks are written in order.
+    """
+    def __init__(self, filename, ext, level):
+        from concurrent.futures import ThreadPoolExecutor
+        self.fout = open(filename, 'wb')
+        self.compress = block_compressor(ext, level)
+        self.threads = os.cpu_count() or 1
+        self.pool = ThreadPoolExecutor(max_workers=self.threads)
+        self.pending = deque()
+        self.blocks = []
+        self.size = 0
+
+    def write(self, data):
+        """ Buffer text or bytes, and compress a block when it is full """
+        if isinstance(data, str):
+            data = data.encode()
+        self.blocks.append(data)
+        self.size += len(data)
+        if self.size >= COMPRESS_BLOCK_SIZE:
+            self.submit()
+        return len(data)
+
+    def submit(self):
+        """ Compress buffered data in the pool and write finished blocks """
+        self.pending.append(self.pool.submit(self.compress, b''.join(self.blocks)))
+        self.blocks = []
+        self.size = 0
+        # wait for the oldest block if too many are pending, to bound memory
+        while self.pending and (self.pending[0].done() or len(self.pending) > 2 * self.threads):
+            self.fout.write(self.pending.popleft().result())
+
+    def flush(self):
+        """ Blocks are written when compressed, nothing to flush """
+
+    def close(self):
+        """ Compress the last block and write all pending blocks """
+        if self.size > 0:
+            self.submit()
+        while self.pending:
+            self.fout.write(self.pending.popleft().result())
+        self.pool.shutdown()
+        self.fout.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def open_output(filename, args, text=False):
+    """ Open an output file, compressed in threads if it ends with .gz, .zst or .lz4 """
+    ext = compression_ext(filename)
+    if ext:
+        return CompressedWriter(filename, ext, args.compress_level)
+    return open(filename, 'w' if text else 'wb', buffering=OUTPUT_BUFFER_SIZE)
+
+def write_graph_file(filename, graph, args):
+    """ Write a graph to a file in the output format """
+    if args.format == 'text':
+        with open_output(filename, args, text=True) as fout:
+            write_edge_list(fout, graph, args)
     else:
-        edge_list = [[edge[0] + base, edge[1] + base] for edge in graph.edges()]
+        writer = {'npy': write_npy, 'npz-csr': write_npz_csr, 'bin': write_bin}[args.format]
+        with open_output(filename, args) as fout:
+            writer(fout, graph, args)
 
-    if filename is None:
-        print(num_node, num_edge)
-        for edge in edge_list:
-            if weighted:
-                print(edge[0], edge[1], edge[2])
-            else:
-                print(edge[0], edge[1])
+def output_edge_list(nx, graph, args):
+    """ Output num node, num edge and edge list, and the summary of the edges if asked """
+    if args.summary is None:
+        write_output(graph, args)
         return
+    view = SummaryView(graph)
+    write_output(view, args)
+    filename = summary_filename(args)
     with open(filename, 'w') as fout:
-        print(num_node, num_edge, file=fout)
-        for edge in edge_list:
-            if weighted:
-                print(edge[0], edge[1], edge[2], file=fout)
-            else:
-                print(edge[0], edge[1], file=fout)
+        json.dump(view.summary.report(), fout, indent=2)
+    if args.output is not None:
+        print('Saved summary in %s' % filename)
+
+def write_output(graph, args):
+    """ Write the edge list to stdout, an output file or shard files """
+    filename = args.output
+    if filename is None:
+        written = write_edge_list(sys.stdout, graph, args)
+        sys.stdout.flush()
+        if getattr(args, 'run_stats', None) is not None:
+            args.run_stats.bytes_written = written
+        return
+    if args.shards > 1:
+        output_shards(graph, args)
+        print('Saved edge list in %s' % manifest_filename(filename))
+        return
+    write_graph_file(filename, graph, args)
     print('Saved edge list in %s' % filename)
 
+def summary_filename(args):
+    """ File name of the JSON summary of edges, e.g. g.summary.json of g.txt """
+    if args.summary:
+        return args.summary
+    compression = compression_ext(args.output)
+    return os.path.splitext(args.output[:len(args.output) - len(compression)])[0] + \
+        '.summary.json'
+
+def find_roots(parent, nodes):
+    """ Roots of nodes in a union-find forest, compressing the paths of nodes """
+    root = parent[nodes]
+    while True:
+        up = parent[root]
+        if (up == root).all():
+            break
+        root = up
+    parent[nodes] = root
+    return root
+
+def union_edges(parent, src, dst):
+    """ Merge the trees of end points of edges, all edges at once
+
+    parent[x] <= x always holds, so a tree is hooked under the smaller root and
+    there are no cycles. Edges whose hook lost to a smaller root of the same
+    tree are merged again with the new roots.
+    """
+    src, dst = src.astype(np.int64), dst.astype(np.int64)
+    while len(src) > 0:
+        src, dst = find_roots(parent, src), find_roots(parent, dst)
+        apart = src != dst
+        low, high = np.minimum(src[apart], dst[apart]), np.maximum(src[apart], dst[apart])
+        np.minimum.at(parent, high, low)
+        src, dst = low, high
+
+class GraphSummary(object):
+    """ Degrees, weakly connected components and weights of edges added chunk by chunk """
+    def __init__(self, num_nodes, directed):
+        self.num_nodes = num_nodes
+        self.directed = directed
+        self.num_edges = 0
+        self.self_loops = 0
+        self.degree = np.zeros(num_nodes, dtype=np.int64)
+        self.parent = np.arange(num_nodes, dtype=np.int64)
+        self.weight_min = None
+        self.weight_max = None
+        self.weight_sum = 0
+
+    def add(self, src, dst, weight):
+        """ Add a chunk of edges """
+        self.num_edges += len(src)
+        self.self_loops += int(np.count_nonzero(src == dst))
+        # a self loop adds 2 to the degree, same as networkx
+        np.add.at(self.degree, src, 1)
+        np.add.at(self.degree, dst, 1)
+        union_edges(self.parent, src, dst)
+        if weight is not None and len(weight) > 0:
+            low, high = weight.min().item(), weight.max().item()
+            self.weight_min = low if self.weight_min is None else min(self.weight_min, low)
+            self.weight_max = high if self.weight_max is None else max(self.weight_max, high)
+            self.weight_sum += weight.sum().item()
+
+    def report(self):
+        """ Summary as a JSON-serializable dict """
+        empty = self.num_nodes == 0
+        weight = None
+        if self.weight_min is not None:
+            weight = {'min': self.weight_min, 'max': self.weight_max,
+                      'mean': self.weight_sum / self.num_edges}
+        return {
+            'num_nodes': self.num_nodes,
+            'num_edges': self.num_edges,
+            'directed': self.directed,
+            'self_loops': self.self_loops,
+            'degree': {'min': None if empty else int(self.degree.min()),
+                       'max': None if empty else int(self.degree.max()),
+                       'mean': None if empty else 2 * self.num_edges / self.num_nodes},
+            # number of nodes of each degree, same as networkx degree_histogram
+            'degree_histogram': np.bincount(self.degree).tolist(),
+            'weakly_connected_components': int(np.count_nonzero(
+                self.parent == np.arange(self.num_nodes))),
+            'weight': weight,
+        }
+
+class SummaryView(EdgeList):
+    """ Edges of a graph passed through unchanged, summarized during the first pass
+
+    summary is set once a pass over all edges has finished, later passes like
+    those of shard files are not counted again.
+    """
+    def __init__(self, graph):
+        super(SummaryView, self).__init__(graph.number_of_nodes(), graph.number_of_edges(),
+                                          graph.is_directed())
+        self.graph = graph
+        self.summary = None
+
+    def chunks(self, size=OUTPUT_CHUNK_SIZE):
+        """ Iterate over edges of the graph as (src, dst, weight) arrays """
+        if self.summary is not None:
+            for chunk in self.graph.chunks(size):
+                yield chunk
+            return
+        summary = GraphSummary(self.num_nodes, self.directed)
+        for src, dst, weight in self.graph.chunks(size):
+            summary.add(src, dst, weight)
+            yield src, dst, weight
+        self.summary = summary
+
+def shard_filename(filename, index):
+    """ File name of a shard of an output file, e.g. g.3.txt of g.txt or g.3.txt.gz of g.txt.gz """
+    compression = compression_ext(filename)
+    root, ext = os.path.splitext(filename[:len(filename) - len(compression)])
+    return '%s.%d%s%s' % (root, index, ext, compression)
+
+def manifest_filename(filename):
+    """ File name of the JSON manifest of shards of an output file, e.g. g.manifest.json """
+    compression = compression_ext(filename)
+    return os.path.splitext(filename[:len(filename) - len(compression)])[0] + '.manifest.json'
+
+def write_manifest(args, num_node, directed, shard_by, shards):
+    """ Write the JSON manifest of shard files, with a dict of counts of each shard """
+    manifest = {
+        'num_nodes': num_node,
+        'num_edges': sum(shard['num_edges'] for shard in shards),
+        'directed': directed,
+        'one_based': args.one_based,
+        'weight': args.w,
+        'format': args.format,
+        'shard_by': shard_by,
+        'shards': shards,
+    }
+    with open(manifest_filename(args.output), 'w') as fout:
+        json.dump(manifest, fout, indent=2)
+
+def shard_of_nodes(nodes, args, num_node):
+    """ Shard index of each source node """
+    if args.shard_by == 'range':
+        return nodes.astype(np.int64) * args.shards // max(num_node, 1)
+    # multiplicative hashing spreads consecutive ids over all shards
+    hashed = nodes.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)
+    return ((hashed >> np.uint64(32)) % np.uint64(args.shards)).astype(np.int64)
+
+def split_shards(src, dst, weight, args, num_node):
+    """ Split a chunk of edges into (src, dst, weight) of each shard, keeping the edge order """
+    shard = shard_of_nodes(src, args, num_node)
+    order = np.argsort(shard, kind='stable')
+    bounds = np.cumsum(np.bincount(shard, minlength=args.shards))[:-1]
+    weights = [None] * args.shards if weight is None else np.split(weight[order], bounds)
+    return zip(np.split(src[order], bounds), np.split(dst[order], bounds), weights)
+
+class ChunkList(EdgeList):
+    """ Edges kept as a list of (src, dst, weight) chunks """
+    def __init__(self, num_nodes, chunk_list, directed=False):
+        super(ChunkList, self).__init__(num_nodes, sum(len(chunk[0]) for chunk in chunk_list),
+                                        directed)
+        self.chunk_list = chunk_list
+
+    def chunks(self, size=OUTPUT_CHUNK_SIZE):
+        """ Iterate over the kept chunks """
+        return iter(self.chunk_list)
+
+def output_shards(graph, args):
+    """ Write shard files of edges partitioned by source node and their manifest
+
+    Edges are counted per shard in a first pass so every shard gets its header,
+    then all shard files are written in a second pass over the edges. npz-csr
+    arrays are written at once, so their shards are kept in memory like an
+    unsharded graph.
+    """
+    num_node = graph.number_of_nodes()
+    num_edges = np.zeros(args.shards, dtype=np.int64)
+    for src, _, _ in graph.chunks():
+        num_edges += np.bincount(shard_of_nodes(src, args, num_node), minlength=args.shards)
+    num_nodes = np.zeros(args.shards, dtype=np.int64)
+    for start in range(0, num_node, CHUNK_SIZE):
+        nodes = np.arange(start, min(start + CHUNK_SIZE, num_node))
+        num_nodes += np.bincount(shard_of_nodes(nodes, args, num_node), minlength=args.shards)
+    filenames = [shard_filename(args.output, i) for i in range(args.shards)]
+    if args.format == 'npz-csr':
+        chunk_lists = [[] for _ in range(args.shards)]
+        for chunk in graph.chunks():
+            for chunk_list, shard in zip(chunk_lists, split_shards(*chunk, args, num_node)):
+                chunk_list.append(shard)
+        for filename, chunk_list in zip(filenames, chunk_lists):
+            write_graph_file(filename, ChunkList(num_node, chunk_list, graph.is_directed()), args)
+    else:
+        encoder = {'text': text_encoder, 'npy': npy_encoder, 'bin': bin_encoder}[args.format]
+        encoders = [encoder(EdgeList(num_node, int(num_edge), graph.is_directed()), args)
+                    for num_edge in num_edges]
+        with contextlib.ExitStack() as stack:
+            fouts = [stack.enter_context(open_output(filename, args, text=args.format == 'text'))
+                     for filename in filenames]
+            for fout, (header, _) in zip(fouts, encoders):
+                fout.write(header)
+            for chunk in graph.chunks():
+                for fout, (_, encode), shard in zip(fouts, encoders,
+                                                    split_shards(*chunk, args, num_node)):
+                    if len(shard[0]):
+                        fout.write(encode(*shard))
+    shards = [{'file': os.path.basename(filename), 'num_nodes': int(num_nodes[i]),
+               'num_edges': int(num_edges[i])} for i, filename in enumerate(filenames)]
+    write_manifest(args, num_node, graph.is_directed(), args.shard_by, shards)
+
+def partition_bounds(args):
+    """ Bounds of contiguous partitions of about equal size of the edge index space """
+    total = num_edge_slots(args.n, args.directed)
+    return [total * i // args.partitions for i in range(args.partitions + 1)]
+
+def split_count(rng, sizes, count):
+    """ Split count distinct picks among partitions of sizes, like a multivariate hypergeometric """
+    if sum(sizes) < MAX_HYPERGEOMETRIC:
+        return rng.multivariate_hypergeometric(sizes, count).tolist()
+    # numpy cannot sample hypergeometric distributions of larger populations,
+    # approximate each marginal by a binomial, or by a normal with finite population
+    # correction when the picks are a notable fraction of the population
+    counts = []
+    population = sum(sizes)
+    for size in sizes:
+        frac = size / population
+        if count * 1000 < population:
+            picked = rng.binomial(count, frac)
+        else:
+            var = count * frac * (1 - frac) * (population - count) / max(population - 1, 1)
+            picked = int(round(rng.normal(count * frac, var ** 0.5)))
+        picked = min(max(picked, count - (population - size), 0), size, count)
+        counts.append(picked)
+        count -= picked
+        population -= size
+    return counts
+
+def partition_counts(args):
+    """ Number of edges of each partition, or None for -grnp """
+    if not args.grnm:
+        return [None] * args.partitions
+    bounds = partition_bounds(args)
+    sizes = [hi - lo for lo, hi in zip(bounds[:-1], bounds[1:])]
+    count = min(args.m, bounds[-1])
+    return split_count(make_rng(args.seed, PARTITION_STREAM), sizes, count)
+
+def gen_partition(args, index, count):
+    """ Sample edges and weights of one partition with its own random stream """
+    lo, hi = partition_bounds(args)[index:index + 2]
+    rng = make_rng(args.seed, PARTITION_STREAM, index)
+    if args.grnm:
+        edge_index = lo + sample_distinct(rng, hi - lo, count)
+    else:
+        edge_index = lo + skip_sample(rng, hi - lo, args.p)
+    src, dst = index_to_edge(edge_index, args.n, args.directed)
+    graph = EdgeArrays(args.n, src, dst, args.directed)
+    if args.w is not None:
+        graph.weight = random_weights(args, graph.num_edges, index)
+    return graph
+
+def seeded_partitions(args):
+    """ Copy of args with a seed, so partitions of unseeded runs agree on it """
+    args = copy.copy(args)
+    if args.seed is None:
+        args.seed = int(np.random.SeedSequence().entropy)
+    return args
+
+def gen_partitions(args):
+    """ Sample all partitions in this process and join them into one graph """
+    args = seeded_partitions(args)
+    graphs = [gen_partition(args, i, count) for i, count in enumerate(partition_counts(args))]
+    graph = EdgeArrays(args.n, np.concatenate([g.src for g in graphs]),
+                       np.concatenate([g.dst for g in graphs]), args.directed)
+    if args.w is not None:
+        graph.weight = np.concatenate([g.weight for g in graphs])
+    return graph
+
+class PartitionStream(EdgeList):
+    """ Partitions of the edge index space sampled one at a time while iterating
+
+    The output is the same as --partitions, but only one partition is in memory.
+    Edge counts of -grnp partitions are not known in advance and take a pass.
+    """
+    def __init__(self, args):
+        self.args = seeded_partitions(args)
+        self.counts = partition_counts(self.args)
+        if self.args.grnp:
+            self.counts = [gen_partition(self.args, i, None).num_edges
+                           for i in range(self.args.partitions)]
+        super(PartitionStream, self).__init__(args.n, sum(self.counts), args.directed)
+
+    @property
+    def weighted(self):
+        """ Partitions draw their own weights """
+        return self.args.w is not None
+
+    def chunks(self, size=OUTPUT_CHUNK_SIZE):
+        """ Iterate over edges of each partition sampled again from its random stream """
+        for i, count in enumerate(self.counts):
+            yield from gen_partition(self.args, i, count if self.args.grnm else None).chunks(size)
+
+def memory_strategy(args):
+    """ Pick how to keep edge arrays within --max-memory and log it to stderr
+
+    Return ('memory', 1) to generate all edges at once, ('partitions', P) to
+    sample P partitions of the edge index space one at a time, or ('buckets', B)
+    to spill a regular graph to B bucket files.
+    """
+    if args.max_memory is None:
+        return 'memory', 1
+    budget = args.max_memory << 20
+    if args.grnm or args.grnp:
+        slots = num_edge_slots(args.n, args.directed)
+        num_edge = min(args.m, slots) if args.grnm else int(slots * args.p)
+        need = num_edge * GNM_BYTES_PER_EDGE
+    elif args.grnd and args.d * 2 <= args.n:
+        num_edge = args.n * args.d // 2
+        need = num_edge * REGULAR_BYTES_PER_EDGE
+    else:
+        print('Memory: no spill strategy for -%s, generating in memory' % graph_type(args),
+              file=sys.stderr)
+        return 'memory', 1
+    summary = 'Memory: -%s needs about %d MB for %d edges' % (graph_type(args), need >> 20,
+                                                               num_edge)
+    if need <= budget * args.partitions:
+        strategy, count = ('memory', 1) if args.partitions == 1 else ('partitions', args.partitions)
+    elif args.grnd:
+        # buckets of low end points are uneven, the first one is about twice the average
+        strategy, count = 'buckets', -(-2 * need // budget)
+    else:
+        strategy, count = 'partitions', max(-(-need // budget), args.partitions)
+    if strategy == 'memory':
+        print('%s, generating in memory' % summary, file=sys.stderr)
+    elif strategy == 'partitions':
+        print('%s, generating %d partitions of the edge index space one at a time '
+              '(same output as --partitions %d, seeded output differs from the in-memory graph)'
+              % (summary, count, count), file=sys.stderr)
+    else:
+        print('%s, spilling to %d bucket files in %s '
+              '(seeded output differs from the in-memory graph)' %
+              (summary, count, args.spill_dir or tempfile.gettempdir()), file=sys.stderr)
+    return strategy, count
+
+def write_partition(args, index, count):
+    """ Sample one partition and write it to its shard file, return the number of edges """
+    graph = gen_partition(args, index, count)
+    write_graph_file(shard_filename(args.output, index), graph, args)
+    return graph.num_edges
+
+def concat_shards(args, num_edges):
+    """ Concatenate shard files into the output file with a fixed up header, remove shards """
+    shards = [shard_filename(args.output, i) for i in range(args.partitions)]
+    total = sum(num_edges)
+    with open(args.output, 'wb', buffering=OUTPUT_BUFFER_SIZE) as fout:
+        for i, shard in enumerate(shards):
+            with open(shard, 'rb') as fin:
+                # skip the header of each shard
+                if args.format == 'text':
+                    header = fin.readline().split()
+                    if i == 0:
+                        fout.write(b'%s %d\n' % (header[0], total))
+                elif args.format == 'bin':
+                    header = list(BIN_HEADER.unpack(fin.read(BIN_HEADER.size)))
+                    if i == 0:
+                        header[-1] = total
+                        fout.write(BIN_HEADER.pack(*header))
+                elif args.format == 'npy':
+                    np.lib.format.read_magic(fin)
+                    shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(fin)
+                    if i == 0:
+                        header = {'descr': np.lib.format.dtype_to_descr(dtype),
+                                  'fortran_order': fortran_order, 'shape': (total, shape[1])}
+                        np.lib.format.write_array_header_1_0(fout, header)
+                shutil.copyfileobj(fin, fout, OUTPUT_BUFFER_SIZE)
+    for shard in shards:
+        os.remove(shard)
+
+def output_partitions(args):
+    """ Write partitions to shard files with a pool of --jobs processes, optionally concatenated
+
+    args.partitions is raised to the count that fits in --max-memory. Return the number of
+    edges, or None if a shard file of the raised count already exists.
+    """
+    strategy, count = memory_strategy(args)
+    if strategy == 'partitions':
+        for i in range(args.partitions, count):
+            if os.path.exists(shard_filename(args.output, i)):
+                print('Error: file %s already exists' % shard_filename(args.output, i))
+                return None
+        args.partitions = count
+    args = seeded_partitions(args)
+    counts = partition_counts(args)
+    if args.jobs > 1:
+        # multiprocessing takes tens of ms to import, only import it for a pool
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            num_edges = list(pool.map(write_partition, [args] * args.partitions,
+                                      range(args.partitions), counts))
+    else:
+        num_edges = [write_partition(args, i, count) for i, count in enumerate(counts)]
+    if args.concat:
+        concat_shards(args, num_edges)
+        print('Saved edge list in %s' % args.output)
+    else:
+        shards = [{'file': os.path.basename(shard_filename(args.output, i)), 'num_edges': num_edge}
+                  for i, num_edge in enumerate(num_edges)]
+        write_manifest(args, args.n, args.directed, 'partition', shards)
+        print('Saved edge list in %s' % manifest_filename(args.output))
+    return sum(num_edges)
+
+def cacheable(args):
+    """ Whether the output of a job can be cached: seeded and a single file or stdout """
+    return (args.cache is not None and args.seed is not None and not args.visualize and
+            args.summary is None and args.shards == 1 and
+            (args.partitions == 1 or args.output is None or args.concat))
+
+def cache_key(args):
+    """ SHA-256 of the generator version and the arguments that change the output """
+    options = {key: value for key, value in vars(args).items() if key not in CACHE_IGNORED_ARGS}
+    options['compression'] = compression_ext(args.output)
+    text = json.dumps({'version': __version__, 'args': options}, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+def cache_filename(args):
+    """ Cache file of a job """
+    ext = FORMAT_EXTENSIONS[args.format] + compression_ext(args.output)
+    return os.path.join(args.cache, cache_key(args) + ext)
+
+def link_or_copy(src, dst):
+    """ Hardlink a file, or copy it if hardlinks are not supported """
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+def evict_cache(args):
+    """ Remove least recently used cache files until the cache fits in --cache-size """
+    files = []
+    for name in os.listdir(args.cache):
+        path = os.path.join(args.cache, name)
+        if not name.endswith('.tmp') and os.path.isfile(path):
+            stat = os.stat(path)
+            files.append((stat.st_mtime, stat.st_size, path))
+    total = sum(size for _, size, _ in files)
+    for _, size, path in sorted(files):
+        if total <= args.cache_size << 20:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            # evicted by a concurrent job
+            pass
+        total -= size
+
+def serve_cached(path, args):
+    """ Output a cache file by hardlink or copy, raise FileNotFoundError on a miss """
+    # the mtime of cache files orders them for eviction
+    os.utime(path)
+    if getattr(args, 'run_stats', None) is not None:
+        args.run_stats.bytes_written = os.path.getsize(path)
+    if args.output is None:
+        with open(path, 'r') as fin:
+            shutil.copyfileobj(fin, sys.stdout, OUTPUT_BUFFER_SIZE)
+        sys.stdout.flush()
+    else:
+        link_or_copy(path, args.output)
+        print('Saved edge list in %s' % args.output)
+
+def run_cached_job(nx, args):
+    """ Serve a job from --cache, or run it and add its output to the cache """
+    path = cache_filename(args)
+    try:
+        with stage(args, 'cache'):
+            serve_cached(path, args)
+        return True
+    except FileNotFoundError:
+        pass
+    os.makedirs(args.cache, exist_ok=True)
+    # write under a temporary name so that concurrent jobs never see partial files
+    temp = '%s.%d.tmp' % (path, os.getpid())
+    if args.output is None:
+        graph = gen_graph(nx, args)
+        if graph is None:
+            return False
+        write_graph_file(temp, graph, args)
+    else:
+        if not output_job(nx, args):
+            return False
+        link_or_copy(args.output, temp)
+    os.replace(temp, path)
+    if args.output is None:
+        serve_cached(path, args)
+    evict_cache(args)
+    return True
+
+def run_job(nx, args):
+    """ Generate, output and visualize one graph, return whether it succeeded """
+    if nx is None:
+        nx = load_networkx(args)
+    if cacheable(args):
+        return run_cached_job(nx, args)
+    return output_job(nx, args)
+
+def output_files(args):
+    """ Files written by the output of a job """
+    if args.output is None:
+        return []
+    num_shards = args.partitions if args.partitions > 1 and not args.concat else args.shards
+    if num_shards == 1:
+        return [args.output]
+    return [shard_filename(args.output, i) for i in range(num_shards)] + \
+           [manifest_filename(args.output)]
+
+def output_job(nx, args):
+    """ Generate, output and visualize one graph without the cache """
+    stats = getattr(args, 'run_stats', None)
+    if args.partitions > 1 and args.output is not None:
+        with stage(args, 'generate and output'):
+            num_edges = output_partitions(args)
+        if num_edges is None:
+            return False
+    else:
+        graph = gen_graph(nx, args)
+        if graph is None:
+            return False
+        num_edges = graph.number_of_edges()
+        with stage(args, 'output'):
+            output_edge_list(nx, graph, args)
+    if stats is not None:
+        stats.num_edges = num_edges
+        if args.output is not None:
+            stats.bytes_written = sum(os.path.getsize(f) for f in output_files(args))
+    if args.visualize:
+        show_graph(nx, graph)
+    return True
+
+def job_argv(parser, job):
+    """ Convert a job of {option: value} to command line arguments
+
+    Options are named without leading dashes, e.g. {"grnm": true, "n": 5, "output": "g.txt"}.
+    Flags are enabled by true, 1 or yes. Empty values are skipped.
+    """
+    argv = []
+    for key, value in job.items():
+        option = '-' + key if '-' + key in parser._option_string_actions else '--' + key
+        action = parser._option_string_actions.get(option)
+        if action is None:
+            raise ValueError('unknown option: %s' % key)
+        if value is None or value == '' or value is False:
+            continue
+        if action.nargs == 0:
+            if str(value).lower() in ['true', '1', 'yes']:
+                argv.append(option)
+        else:
+            argv += [option, str(value)]
+    return argv
+
+def read_batch_jobs(filename):
+    """ Read jobs of a manifest as (label, job), parsed by batch_job_argv
+
+    A CSV manifest has a header row of option names and one job per row.
+    A JSONL manifest has one job per line, as an object of options, a list of
+    arguments or a command line string.
+    """
+    with open(filename, newline='') as fin:
+        if filename.endswith('.csv'):
+            return [(','.join(value or '' for value in row.values()), row)
+                    for row in csv.DictReader(fin)]
+        return [(line.strip(), line) for line in fin if line.strip()]
+
+def batch_job_argv(parser, job):
+    """ Command line arguments of a CSV row or a JSONL line, raise ValueError if invalid """
+    if isinstance(job, dict):
+        return job_argv(parser, job)
+    return json_job_argv(parser, json.loads(job))
+
+def json_job_argv(parser, job):
+    """ Command line arguments of a JSON job: an object of options, a list of arguments
+    or a command line string
+    """
+    if isinstance(job, dict):
+        return job_argv(parser, job)
+    if isinstance(job, list):
+        return [str(arg) for arg in job]
+    if isinstance(job, str):
+        return shlex.split(job)
+    raise ValueError('a job must be an object, a list or a string')
+
+def sweep_output(args, seed):
+    """ Output file name of one seed of a seed sweep """
+    template = args.output
+    if template is None:
+        template = SWEEP_OUTPUT_TCH if args.tch else SWEEP_OUTPUT
+        template += FORMAT_EXTENSIONS[args.format]
+    return template.format(**dict(vars(args), type=graph_type(args), seed=seed))
+
+def sweep_jobs(args):
+    """ Make (label, job args) of each seed of a seed sweep """
+    jobs = []
+    for seed in args.seed_range:
+        job_args = copy.copy(args)
+        job_args.seed = seed
+        job_args.seed_range = None
+        job_args.output = sweep_output(args, seed)
+        label = 'seed %d -> %s' % (seed, job_args.output)
+        if os.path.exists(job_args.output):
+            print('Error: file %s already exists' % job_args.output)
+            job_args = None
+        jobs.append((label, job_args))
+    return jobs
+
+def manifest_jobs(args):
+    """ Make (label, job args) of each job in a batch manifest, job args is None if invalid """
+    parser = create_parser()
+    jobs = []
+    for label, job in read_batch_jobs(args.batch):
+        job_args = None
+        try:
+            argv = batch_job_argv(parser, job)
+            label = ' '.join(argv)
+            job_args = parse_arguments(argv)
+            if job_args.batch is not None or job_args.seed_range is not None \
+                    or job_args.output is None:
+                print('Error: a batch job needs --output and cannot be a batch')
+                job_args = None
+            elif job_args.cache is None:
+                # jobs share the cache of the batch
+                job_args.cache, job_args.cache_size = args.cache, args.cache_size
+        except ValueError as err:
+            print('Error: %s' % err)
+        except SystemExit:
+            # argparse already printed the error
+            pass
+        jobs.append((label, job_args))
+    return jobs
+
+def run_job_timed(nx, args):
+    """ Run one job, return its status and time in seconds """
+    start = time.perf_counter()
+    status = 'failed'
+    try:
+        if run_job(nx, args):
+            status = 'ok'
+    except Exception as err: # pylint: disable=broad-except
+        print('Error: %s' % err)
+    return status, time.perf_counter() - start
+
+def run_job_worker(args):
+    """ Run one job in a worker process of a process pool """
+    status, seconds = run_job_timed(None, args)
+    sys.stdout.flush()
+    return status, seconds
+
+def run_batch(nx, args):
+    """ Generate graphs of a batch manifest or a seed sweep and print a summary
+
+    With --jobs N, graphs are generated and output by a pool of N processes.
+    A failing job is reported in the summary without stopping other jobs.
+    """
+    jobs = sweep_jobs(args) if args.seed_range is not None else manifest_jobs(args)
+    results = [('failed', 0.0)] * len(jobs)
+    if args.jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+            futures = [(i, pool.submit(run_job_worker, job_args))
+                       for i, (_, job_args) in enumerate(jobs) if job_args is not None]
+            for i, future in futures:
+                try:
+                    results[i] = future.result()
+                except Exception as err: # pylint: disable=broad-except
+                    print('Error: %s' % err)
+    else:
+        for i, (_, job_args) in enumerate(jobs):
+            if job_args is not None:
+                results[i] = run_job_timed(nx, job_args)
+
+    print('%-5s %-7s %9s  %s' % ('job', 'status', 'seconds', 'arguments'))
+    for i, ((label, _), (status, seconds)) in enumerate(zip(jobs, results)):
+        print('%-5d %-7s %9.3f  %s' % (i + 1, status, seconds, label))
+    num_ok = sum(1 for status, _ in results if status == 'ok')
+    print('%d of %d jobs succeeded' % (num_ok, len(jobs)))
+
+def edge_array(graph, args):
+    """ All edges as an (m,2) or (m,3) array, the same as the npy output format """
+    base = 1 if args.one_based else 0
+    array = np.empty((graph.number_of_edges(), 2 if args.w is None else 3),
+                     dtype=edge_array_dtype(graph, args))
+    start = 0
+    for src, dst, weight in graph.chunks():
+        stop = start + len(src)
+        array[start:stop, 0] = src + base
+        array[start:stop, 1] = dst + base
+        if weight is not None:
+            array[start:stop, 2] = weight
+        start = stop
+    return array
+
+def iter_edges(graph, args):
+    """ Iterate over edges as (u, v) or (u, v, w) tuples, converted chunk by chunk """
+    base = 1 if args.one_based else 0
+    for src, dst, weight in graph.chunks():
+        ends = [(src + base).tolist(), (dst + base).tolist()]
+        if weight is not None:
+            ends.append(weight.tolist())
+        yield from zip(*ends)
+
+def generate(kind, n=None, m=None, d=None, p=None, c=None, h=None, seed=None,
+             directed=False, weights=None, wmin=None, wmax=None, one_based=False,
+             engine=None, array=False, gamma=None, avgdeg=None, k=None, r=None,
+             distance_weights=False, connected=False):
+    """ Generate a graph in-process without touching stdout
+
+    kind is a graph type such as 'grnm', the other arguments are the same as
+    the command line options, with weights being 'int' or 'float' like -w.
+    Return an iterator over (u, v) or (u, v, w) tuples, or an (m,2) or (m,3)
+    numpy array if array is True. Raise ValueError for invalid arguments and
+    GraphError if the graph cannot be generated.
+    """
+    kind = kind.lstrip('-')
+    if kind not in GRAPH_TYPES:
+        raise ValueError('unknown graph type: %s' % kind)
+    parser = create_parser(ApiArgumentParser)
+    options = {kind: True, 'n': n, 'm': m, 'd': d, 'p': p, 'c': c, 'h': h, 'seed': seed,
+               'directed': directed, 'w': weights, 'wmin': wmin, 'wmax': wmax,
+               'one-based': one_based, 'engine': engine, 'gamma': gamma, 'avgdeg': avgdeg,
+               'k': k, 'r': r, 'distance-weights': distance_weights,
+               'connected': connected}
+    args = parse_arguments(job_argv(parser, options), parser)
+    graph = build_graph(load_networkx(args), args)
+    return edge_array(graph, args) if array else iter_edges(graph, args)
+
+class QueueOutput(object):
+    """ Output stream of a worker thread, passing written bytes to a response on the event loop
+
+    Writes wait while SERVE_QUEUE_SIZE chunks are buffered, and fail once the
+    client is gone so that the worker stops generating.
+    """
+    def __init__(self, loop, queue):
+        self.loop = loop
+        self.queue = queue
+        self.closed = False
+
+    def put(self, item):
+        """ Pass bytes, an exception or None at the end to the response """
+        import asyncio
+        asyncio.run_coroutine_threadsafe(self.queue.put(item), self.loop).result()
+
+    def write(self, data):
+        """ Write text or bytes """
+        if self.closed:
+            raise ConnectionError('client disconnected')
+        self.put(data.encode() if isinstance(data, str) else data)
+
+def serve_job(args, output):
+    """ Generate a graph and write its edge list to the output of a response, in a worker """
+    try:
+        graph = build_graph(load_networkx(args), args)
+        write_edge_list(output, graph, args)
+    except Exception as err: # pylint: disable=broad-except
+        output.put(err)
+    else:
+        output.put(None)
+
+def request_args(parser, method, target, body):
+    """ Parse the options of a request into the args of a job
+
+    GET options are query parameters, e.g. /?grnm&n=5&m=5&seed=1, flags may have
+    no value. A POST body is a JSON job like a line of a batch manifest.
+    """
+    from urllib.parse import urlsplit, parse_qsl
+    if method == 'GET':
+        query = parse_qsl(urlsplit(target).query, keep_blank_values=True)
+        job = {key: value if value else True for key, value in query}
+    elif method == 'POST':
+        job = json.loads(body.decode() or '{}')
+    else:
+        raise ValueError('method %s is not supported' % method)
+    try:
+        args = parse_arguments(json_job_argv(parser, job), parser)
+    except SystemExit:
+        raise ValueError('invalid options')
+    for name, option in SERVE_REJECTED:
+        if getattr(args, name) not in (None, False):
+            raise ValueError('%s is not supported by --serve' % option)
+    return args
+
+async def read_request(reader):
+    """ Read an HTTP request, return its method, target and body """
+    fields = (await reader.readline()).decode('latin-1').split()
+    if len(fields) != 3:
+        raise ValueError('invalid request line')
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    if length > SERVE_MAX_BODY:
+        raise ValueError('request body is larger than %d bytes' % SERVE_MAX_BODY)
+    body = await reader.readexactly(length) if length else b''
+    return fields[0], fields[1], body
+
+def response_head(status, reason, content_type='text/plain'):
+    """ Status line and headers of a response, the body ends when the connection closes """
+    return ('HTTP/1.1 %d %s\r\nContent-Type: %s\r\nConnection: close\r\n\r\n' %
+            (status, reason, content_type)).encode()
+
+async def handle_request(reader, writer, parser, pool):
+    """ Answer one request with a streamed edge list, or 400 and the error """
+    import asyncio
+    loop = asyncio.get_running_loop()
+    output = None
+    try:
+        try:
+            args = request_args(parser, *await read_request(reader))
+        except ValueError as err:
+            writer.write(response_head(400, 'Bad Request') + b'Error: %s\n' % str(err).encode())
+            return
+        output = QueueOutput(loop, asyncio.Queue(maxsize=SERVE_QUEUE_SIZE))
+        loop.run_in_executor(pool, serve_job, args, output)
+        # errors of generation come before any edge
+        item = await output.queue.get()
+        if isinstance(item, Exception):
+            writer.write(response_head(400, 'Bad Request') + b'Error: %s\n' % str(item).encode())
+            return
+        writer.write(response_head(200, 'OK'))
+        while isinstance(item, bytes):
+            writer.write(item)
+            await writer.drain()
+            item = await output.queue.get()
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        if output is not None:
+            output.closed = True
+            # unblock a worker waiting to pass the next chunk
+            while not output.queue.empty():
+                output.queue.get_nowait()
+        try:
+            await writer.drain()
+            writer.close()
+        except ConnectionError:
+            pass
+
+async def serve_forever(args):
+    """ Accept requests until cancelled, generating graphs with a pool of --jobs threads """
+    import asyncio
+    import signal
+    from concurrent.futures import ThreadPoolExecutor
+    parser = create_parser(ApiArgumentParser, add_help=False)
+    with ThreadPoolExecutor(max_workers=args.jobs) as pool:
+        def handler(reader, writer):
+            """ Handle a connection """
+            return handle_request(reader, writer, parser, pool)
+        if isinstance(args.serve, str):
+            server = await asyncio.start_unix_server(handler, path=args.serve)
+            address = args.serve
+        else:
+            server = await asyncio.start_server(handler, *args.serve)
+            address = 'http://%s:%d' % server.sockets[0].getsockname()[:2]
+        print('Serving on %s with %d workers' % (address, args.jobs), file=sys.stderr)
+        if sys.platform != 'win32':
+            # stop like on Ctrl-C, so that the unix socket is removed
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM,
+                                                          asyncio.current_task().cancel)
+        async with server:
+            try:
+                await server.serve_forever()
+            except asyncio.CancelledError:
+                pass
+
+def serve(args):
+    """ Serve edge lists of requests until interrupted
+
+    Imports stay loaded between requests, requests are read and answered
+    concurrently on an event loop, and graphs are generated by a bounded pool
+    of worker threads.
+    """
+    import asyncio
+    try:
+        asyncio.run(serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if isinstance(args.serve, str) and os.path.exists(args.serve):
+            os.remove(args.serve)
+
+def print_startup_profile(times):
+    """ Print time of startup stages in milliseconds to stderr """
+    stages = ', '.join('%s %.1f ms' % (stage, seconds * 1000) for stage, seconds in times)
+    print('Startup: %s' % stages, file=sys.stderr)
+
 def main(argv):
     """ Graph generator main entry """
+    start, cpu = time.perf_counter(), time.process_time()
     args = parse_arguments(argv)
+    parse_seconds, parse_cpu = time.perf_counter() - start, time.process_time() - cpu
 
-    # To speed up error check, import networkx module here
-    import networkx as nx
+    profiler = None
+    if args.profile is not None:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    if args.stats is not None:
+        args.run_stats = Stats()
+        args.run_stats.add('import modules', IMPORT_SECONDS)
+        args.run_stats.add('parse arguments', parse_seconds, parse_cpu)
 
-    graph = gen_graph(nx, args)
-    if graph is not None:
-        output_edge_list(nx, graph, args)
-        if args.visualize:
-            show_graph(nx, graph)
+    # To speed up error check and small graphs, import networkx only if needed
+    nx = None
+    start, cpu = time.perf_counter(), time.process_time()
+    if args.batch is None and args.seed_range is None and args.serve is None:
+        nx = load_networkx(args)
+    networkx_seconds = time.perf_counter() - start
+    if args.profile_startup:
+        print_startup_profile([('import modules', IMPORT_SECONDS),
+                               ('parse arguments', parse_seconds),
+                               ('import networkx' if nx is not None else 'skip networkx',
+                                networkx_seconds)])
+    if args.stats is not None and nx is not None:
+        args.run_stats.add('import networkx', networkx_seconds, time.process_time() - cpu)
+
+    try:
+        if args.serve is not None:
+            serve(args)
+        elif args.batch is not None or args.seed_range is not None:
+            sys.stdout.flush()
+            run_batch(nx, args)
+        else:
+            run_job(nx, args)
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+        if args.stats is not None:
+            args.run_stats.report(args.stats)
 
 if __name__ == '__main__':
     main(sys.argv[1:])
@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Graph Loader
+
+Load edge lists written by gen_graph.py as numpy edge arrays or CSR arrays,
+parsing text in large chunks with numpy instead of line by line
+
+Input Formats:
+    text: <num-nodes> <num-edges> header and <from-node> <to-node> [weight] lines
+    npy, npz-csr, bin: binary formats of gen_graph.py --format
+    <file>.manifest.json: shard files of --shards or --partitions
+    Files other than npz-csr and manifests may be compressed as .gz, .zst or .lz4
+
+Example:
+    $ python load_graph.py g.txt
+    $ python load_graph.py g.manifest.json g.bin.gz
+    >>> import load_graph
+    >>> graph = load_graph.load_graph('g.txt')
+    >>> graph.src, graph.dst, graph.weight
+    >>> indptr, indices, weights = load_graph.load_csr('g.npz')
+"""
+
+import sys
+import os
+import io
+import time
+import json
+import mmap
+import argparse
+import warnings
+import numpy as np
+
+import gen_graph
+
+# bytes of text parsed at once, cut at a line end
+TEXT_CHUNK_SIZE = 1 << 26
+# format of each file extension, without compression
+EXTENSION_FORMATS = {ext: name for name, ext in gen_graph.FORMAT_EXTENSIONS.items()}
+
+def open_input(filename):
+    """ Open a binary input file, decompressed if it ends with .gz, .zst or .lz4 """
+    ext = gen_graph.compression_ext(filename)
+    if ext == '.gz':
+        import gzip
+        return gzip.open(filename, 'rb')
+    if ext == '.zst':
+        import zstandard
+        # files are written as many concatenated frames
+        return zstandard.ZstdDecompressor().stream_reader(open(filename, 'rb'), closefd=True,
+                                                          read_across_frames=True)
+    if ext == '.lz4':
+        import lz4.frame
+        return lz4.frame.open(filename, 'rb')
+    return open(filename, 'rb')
+
+def input_buffer(filename):
+    """ Whole content of an input file, memory-mapped unless it is compressed """
+    if gen_graph.compression_ext(filename):
+        with open_input(filename) as fin:
+            return fin.read()
+    with open(filename, 'rb') as fin:
+        if os.fstat(fin.fileno()).st_size == 0:
+            return b''
+        # the map stays valid after the file is closed
+        return mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+
+def file_format(filename):
+    """ Format of an input file by its extension, text if unknown """
+    if filename.endswith('.manifest.json'):
+        return 'manifest'
+    ext = os.path.splitext(filename[:len(filename) - len(gen_graph.compression_ext(filename))])[1]
+    return EXTENSION_FORMATS.get(ext, 'text')
+
+def read_text_header(fin, filename):
+    """ Read the <num-nodes> <num-edges> header line """
+    fields = fin.readline().split()
+    if len(fields) != 2 or not all(field.isdigit() for field in fields):
+        raise ValueError('%s: invalid header, expected "<num-nodes> <num-edges>"' % filename)
+    return int(fields[0]), int(fields[1])
+
+def text_chunks(fin):
+    """ Iterate over chunks of about TEXT_CHUNK_SIZE bytes of complete lines """
+    rest = b''
+    while True:
+        block = fin.read(TEXT_CHUNK_SIZE)
+        if not block:
+            break
+        block = rest + block
+        cut = block.rfind(b'\n') + 1
+        rest = block[cut:]
+        if cut > 0:
+            yield block[:cut]
+    if rest.strip():
+        yield rest
+
+def text_columns(line, filename):
+    """ Number of columns and weight type of an edge line """
+    fields = line.split()
+    if len(fields) == 2:
+        return 2, None
+    if len(fields) == 3:
+        # float weights are written like 52.0, int weights without a dot
+        try:
+            int(fields[2])
+            return 3, 'int'
+        except ValueError:
+            return 3, 'float'
+    raise ValueError('%s: invalid edge line "%s"' % (filename, line.decode(errors='replace')))
+
+def parse_numbers(chunk, dtype, filename):
+    """ Parse whitespace separated numbers of a chunk of text in C """
+    with warnings.catch_warnings():
+        # numpy only warns if it stops at text that is not a number
+        warnings.simplefilter('error')
+        try:
+            return np.fromstring(chunk, dtype=dtype, sep=' ')
+        except (DeprecationWarning, ValueError):
+            raise ValueError('%s: invalid number in edge lines' % filename)
+
+def read_text(fin, filename):
+    """ Read a text edge list, return (num nodes, src, dst, weight) """
+    num_node, num_edge = read_text_header(fin, filename)
+    columns, values, filled = 2, np.empty(0, dtype=np.int64), 0
+    for chunk in text_chunks(fin):
+        if filled == 0:
+            columns, weight_type = text_columns(chunk.split(b'\n', 1)[0], filename)
+            dtype = np.float64 if weight_type == 'float' else np.int64
+            values = np.empty(num_edge * columns, dtype=dtype)
+        numbers = parse_numbers(chunk, values.dtype, filename)
+        if filled + len(numbers) > len(values):
+            raise ValueError('%s: more edges than %d of the header' % (filename, num_edge))
+        values[filled:filled + len(numbers)] = numbers
+        filled += len(numbers)
+    if filled != num_edge * columns:
+        raise ValueError('%s: %d edges in the header, found %.6g' %
+                         (filename, num_edge, filled / columns))
+    values = values.reshape(num_edge, columns)
+    weight = values[:, 2] if columns == 3 else None
+    return num_node, values[:, 0].astype(np.int64), values[:, 1].astype(np.int64), weight
+
+def read_bin(filename):
+    """ Read a bin file, return (num nodes, src, dst, weight, directed, one based) """
+    buf = input_buffer(filename)
+    if len(buf) < gen_graph.BIN_HEADER.size:
+        raise ValueError('%s: truncated bin header' % filename)
+    magic, version, id_bytes, weight_type, flags, num_node, num_edge = \
+        gen_graph.BIN_HEADER.unpack_from(buf)
+    if magic != gen_graph.BIN_MAGIC or version != 1:
+        raise ValueError('%s: not a version 1 bin file' % filename)
+    dtype = gen_graph.bin_record_dtype(id_bytes, weight_type)
+    if len(buf) - gen_graph.BIN_HEADER.size != num_edge * dtype.itemsize:
+        raise ValueError('%s: %d edges in the header, found %.6g' % (
+            filename, num_edge, (len(buf) - gen_graph.BIN_HEADER.size) / dtype.itemsize))
+    records = np.frombuffer(buf, dtype=dtype, count=num_edge, offset=gen_graph.BIN_HEADER.size)
+    weight = records['weight'] if weight_type else None
+    return (num_node, records['src'], records['dst'], weight,
+            bool(flags & gen_graph.BIN_FLAG_DIRECTED), bool(flags & gen_graph.BIN_FLAG_ONE_BASED))
+
+def read_npy(filename):
+    """ Read an (m,2) or (m,3) npy array, return (src, dst, weight) """
+    if gen_graph.compression_ext(filename):
+        array = np.load(io.BytesIO(input_buffer(filename)))
+    else:
+        array = np.load(filename, mmap_mode='r')
+    if array.ndim != 2 or array.shape[1] not in (2, 3):
+        raise ValueError('%s: expected an (m, 2) or (m, 3) array, found %s' %
+                         (filename, array.shape))
+    weight = array[:, 2] if array.shape[1] == 3 else None
+    return array[:, 0].astype(np.int64), array[:, 1].astype(np.int64), weight
+
+def read_npz_csr(filename):
+    """ Read npz-csr arrays, return (num nodes, indptr, indices, weights, directed, one based) """
+    with np.load(filename) as arrays:
+        num_node = int(arrays['num_nodes'])
+        indptr, indices = arrays['indptr'], arrays['indices']
+        weights = arrays['weights'] if 'weights' in arrays else None
+        directed, one_based = bool(arrays['directed']), bool(arrays['one_based'])
+    if len(indptr) != num_node + 1 or indptr[-1] != len(indices):
+        raise ValueError('%s: indptr does not match %d nodes and %d edges' %
+                         (filename, num_node, len(indices)))
+    return num_node, indptr, indices, weights, directed, one_based
+
+def check_node_ids(src, dst, num_node, one_based, filename):
+    """ Check node ids are in range, return whether they are one-based
+
+    If one_based is None, ids are one-based when none is 0 and one is n, as
+    zero-based ids are at most n-1.
+    """
+    if len(src) == 0:
+        return bool(one_based)
+    low = min(int(src.min()), int(dst.min()))
+    high = max(int(src.max()), int(dst.max()))
+    if one_based is None:
+        one_based = low >= 1 and high == num_node
+    base = 1 if one_based else 0
+    if low < base or high >= num_node + base:
+        raise ValueError('%s: node id out of range [%d, %d]' %
+                         (filename, base, num_node + base - 1))
+    return one_based
+
+def edge_arrays(num_node, src, dst, weight, directed, base):
+    """ Zero-based edge arrays of the smallest node id type """
+    dtype = gen_graph.node_dtype(num_node)
+    if base:
+        src, dst = src - base, dst - base
+    graph = gen_graph.EdgeArrays(num_node, src.astype(dtype, copy=False),
+                                 dst.astype(dtype, copy=False), directed)
+    graph.weight = weight
+    return graph
+
+def load_manifest(filename, one_based, directed):
+    """ Load and concatenate the shard files of a manifest """
+    with open(filename) as fin:
+        manifest = json.load(fin)
+    num_node = manifest['num_nodes']
+    folder = os.path.dirname(filename)
+    graphs = [load_graph(os.path.join(folder, shard['file']),
+                         manifest['one_based'] if one_based is None else one_based,
+                         manifest['directed'] if directed is None else directed, num_node)
+              for shard in manifest['shards']]
+    src = np.concatenate([g.src for g in graphs] + [np.empty(0, dtype=np.int32)])
+    dst = np.concatenate([g.dst for g in graphs] + [np.empty(0, dtype=np.int32)])
+    weight = None
+    if manifest.get('weight') is not None:
+        # empty text shards have no weight column, so the weight type is the manifest's
+        dtype = np.int64 if manifest['weight'] == 'int' else np.float64
+        for shard, g in zip(manifest['shards'], graphs):
+            if g.weight is None and len(g.src):
+                raise ValueError('%s: shard %s has no weights' % (filename, shard['file']))
+        weight = np.concatenate([g.weight for g in graphs if g.weight is not None] +
+                                [np.empty(0, dtype=dtype)])
+    if len(src) != manifest['num_edges']:
+        raise ValueError('%s: %d edges in the manifest, found %d' %
+                         (filename, manifest['num_edges'], len(src)))
+    return edge_arrays(num_node, src, dst, weight, graphs[0].directed if graphs else False, 0)
+
+def load_graph(filename, one_based=None, directed=None, num_nodes=None):
+    """ Load an edge list file written by gen_graph.py as zero-based EdgeArrays
+
+    The format is found by the file extension. Weights are found by the number
+    of columns or the binary header. one_based and directed are read from
+    binary headers, one-based text ids are detected by node id n, and are
+    False otherwise unless given. npy files have no number of nodes, it is
+    num_nodes if given, or the largest node id plus one.
+    Raise ValueError if the file does not match its header.
+    """
+    fmt = file_format(filename)
+    if fmt == 'manifest':
+        return load_manifest(filename, one_based, directed)
+    flags = (False, None)
+    if fmt == 'text':
+        buf = input_buffer(filename)
+        fin = buf if isinstance(buf, mmap.mmap) else io.BytesIO(buf)
+        num_node, src, dst, weight = read_text(fin, filename)
+    elif fmt == 'bin':
+        num_node, src, dst, weight, is_directed, is_one_based = read_bin(filename)
+        flags = (is_directed, is_one_based)
+    elif fmt == 'npy':
+        src, dst, weight = read_npy(filename)
+        num_node = num_nodes
+        if num_node is None:
+            base = 1 if one_based else 0
+            num_node = max(int(src.max()), int(dst.max())) + 1 - base if len(src) else 0
+    else:
+        num_node, indptr, indices, weight, is_directed, is_one_based = read_npz_csr(filename)
+        src = np.repeat(np.arange(num_node, dtype=np.int64), np.diff(indptr))
+        dst = indices.astype(np.int64) - is_one_based
+        flags = (is_directed, False)
+    if num_nodes is not None and num_node != num_nodes:
+        raise ValueError('%s: %d nodes, expected %d' % (filename, num_node, num_nodes))
+    if flags[1] is not None:
+        one_based = flags[1]
+    one_based = check_node_ids(src, dst, num_node, one_based, filename)
+    if directed is None:
+        directed = flags[0]
+    return edge_arrays(num_node, src, dst, weight, directed, 1 if one_based else 0)
+
+def edge_csr(graph):
+    """ Compressed sparse row arrays (indptr, indices, weights) of EdgeArrays by source node """
+    num_node = graph.number_of_nodes()
+    # stable sort keeps the order of edges from the same node
+    order = np.argsort(graph.src, kind='stable')
+    indptr = np.zeros(num_node + 1, dtype=np.int64)
+    np.cumsum(np.bincount(graph.src, minlength=num_node), out=indptr[1:])
+    weights = None if graph.weight is None else graph.weight[order]
+    return indptr, graph.dst[order], weights
+
+def load_csr(filename, one_based=None, directed=None, num_nodes=None):
+    """ Load an edge list file as zero-based CSR arrays (indptr, indices, weights)
+
+    npz-csr files are returned as stored, except for one-based indices.
+    """
+    if file_format(filename) == 'npz-csr':
+        _, indptr, indices, weights, _, is_one_based = read_npz_csr(filename)
+        return indptr, indices - is_one_based if is_one_based else indices, weights
+    return edge_csr(load_graph(filename, one_based, directed, num_nodes))
+
+def main(argv):
+    """ Load each file and print its number of nodes and edges """
+    parser = argparse.ArgumentParser(description='Load edge lists written by gen_graph.py')
+    parser.add_argument('files', metavar='FILE', nargs='+',
+                        help='text, npy, npz or bin file, or a shard manifest')
+    parser.add_argument('--one-based', action='store_true',
+                        help='read node ids of text and npy files as one-based')
+    parser.add_argument('--directed', action='store_true',
+                        help='read text and npy files as directed graphs')
+    args = parser.parse_args(argv)
+    status = 0
+    for filename in args.files:
+        start = time.perf_counter()
+        try:
+            graph = load_graph(filename, args.one_based or None, args.directed or None)
+        except (OSError, ValueError, KeyError) as err:
+            print('Error: %s' % err)
+            status = 1
+            continue
+        weight = 'no'
+        if graph.weight is not None:
+            weight = 'float' if graph.weight.dtype.kind == 'f' else 'int'
+        print('%s: %d nodes, %d edges, %s, %s weights, %.3f s' % (
+            filename, graph.number_of_nodes(), graph.number_of_edges(),
+            'directed' if graph.is_directed() else 'undirected', weight,
+            time.perf_counter() - start))
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -7,9 +7,14 @@ Date: Jan 6, 2020
 """
 
 from io import StringIO
+import os
+import tempfile
+import warnings
 import unittest
 from unittest.mock import patch
 import gen_graph
+import load_graph
+import bench_gen_graph
 
 class TestGrnm(unittest.TestCase):
     """ Unit tests for random graph with n nodes and m edges """
@@ -129,29 +134,85 @@ class TestGrnm(unittest.TestCase):
             self.assertEqual(redirect.getvalue(), '2 1\n1 2\n')
     def test_grnm_n3_m1_dir_seed0_wint(self):
         """ Test grnm n=3 m=1 directed seed=5 w=int"""
-        argv = ['-grnm', '-n', '3', '-m', '1', '--dir', '--seed', '0', '-w', 'int']
+        argv = ['-grnm', '-n', '3', '-m', '1', '--dir', '--seed', '0', '-w', 'int', '--legacy-weights']
         with patch('sys.stdout', new=StringIO()) as redirect:
             gen_graph.main(argv)
             self.assertEqual(redirect.getvalue(), '3 1\n0 1 49\n')
     def test_grnm_n3_m1_dir_seed0_wint_range(self):
         """ Test grnm n=3 m=1 directed seed=5 w=int wmin=77 wmax=77"""
-        argv = ['-grnm', '-n', '3', '-m', '1', '--dir', '--seed', '0', '-w', 'int', '-wmin', '77', '-wmax', '77']
+        argv = ['-grnm', '-n', '3', '-m', '1', '--dir', '--seed', '0', '-w', 'int', '-wmin', '77', '-wmax', '77', '--legacy-weights']
         with patch('sys.stdout', new=StringIO()) as redirect:
             gen_graph.main(argv)
             self.assertEqual(redirect.getvalue(), '3 1\n0 1 77\n')
     def test_grnm_n3_m1_dir_seed0_wfloat(self):
         """ Test grnm n=3 m=1 directed seed=5 w=float"""
-        argv = ['-grnm', '-n', '3', '-m', '1', '--dir', '--seed', '0', '-w', 'float']
+        argv = ['-grnm', '-n', '3', '-m', '1', '--dir', '--seed', '0', '-w', 'float', '--legacy-weights']
         with patch('sys.stdout', new=StringIO()) as redirect:
             gen_graph.main(argv)
             self.assertEqual(redirect.getvalue(), '3 1\n0 1 84.44\n')
     def test_grnm_n3_m1_dir_seed0_wfloat_range(self):
         """ Test grnm n=3 m=1 directed seed=5 w=float wmin=12.34 wmax=12.36"""
-        argv = ['-grnm', '-n', '3', '-m', '1', '--dir', '--seed', '0', '-w', 'float', '-wmin', '12.34', '-wmax', '12.36']
+        argv = ['-grnm', '-n', '3', '-m', '1', '--dir', '--seed', '0', '-w', 'float', '-wmin', '12.34', '-wmax', '12.36', '--legacy-weights']
         with patch('sys.stdout', new=StringIO()) as redirect:
             gen_graph.main(argv)
             self.assertEqual(redirect.getvalue(), '3 1\n0 1 12.35\n')
 
+class TestGrnmNumpy(unittest.TestCase):
+    """ Unit tests for random graph with n nodes and m edges using numpy engine """
+    def test_grnm_numpy_n0_m0(self):
+        """ Test grnm numpy n=0 m=0 """
+        argv = ['-grnm', '-n', '0', '-m', '0', '--engine', 'numpy']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '0 0\n')
+    def test_grnm_numpy_n1_m1(self):
+        """ Test grnm numpy n=1 m=1 """
+        argv = ['-grnm', '-n', '1', '-m', '1', '--engine', 'numpy']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '1 0\n')
+    def test_grnm_numpy_n2_m2(self):
+        """ Test grnm numpy n=2 m=2 """
+        argv = ['-grnm', '-n', '2', '-m', '2', '--engine', 'numpy']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '2 1\n0 1\n')
+    def test_grnm_numpy_n2_m2_dir(self):
+        """ Test grnm numpy n=2 m=2 directed """
+        argv = ['-grnm', '-n', '2', '-m', '2', '--dir', '--engine', 'numpy']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '2 2\n0 1\n1 0\n')
+    def test_grnm_numpy_n5_m7_seed0(self):
+        """ Test grnm numpy n=5 m=7 seed=0 """
+        argv = ['-grnm', '-n', '5', '-m', '7', '--seed', '0', '--engine', 'numpy']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '5 7\n0 1\n0 2\n0 3\n0 4\n1 2\n2 3\n3 4\n')
+    def test_grnm_numpy_n100_m500_dir(self):
+        """ Test grnm numpy n=100 m=500 directed gives distinct edges without self loops """
+        argv = ['-grnm', '-n', '100', '-m', '500', '--dir', '--seed', '3', '--engine', 'numpy']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            lines = redirect.getvalue().splitlines()
+        self.assertEqual(lines[0], '100 500')
+        edges = [tuple(map(int, line.split())) for line in lines[1:]]
+        self.assertEqual(len(set(edges)), 500)
+        self.assertTrue(all(u != v and 0 <= u < 100 and 0 <= v < 100 for u, v in edges))
+    def test_grnm_numpy_dense(self):
+        """ Test grnm numpy n=20 m=180 undirected samples the complement """
+        graph = gen_graph.gnm_edge_arrays(20, 180, seed=0)
+        edges = set(zip(graph.src.tolist(), graph.dst.tolist()))
+        self.assertEqual(len(edges), 180)
+        self.assertTrue(all(u < v < 20 for u, v in edges))
+    def test_grnm_numpy_index_to_edge(self):
+        """ Test edge index mapping covers every node pair once """
+        for directed in [False, True]:
+            total = gen_graph.num_edge_slots(7, directed)
+            src, dst = gen_graph.index_to_edge(gen_graph.np.arange(total), 7, directed)
+            pairs = [(u, v) for u in range(7) for v in range(7) if u != v and (directed or u < v)]
+            self.assertEqual(list(zip(src.tolist(), dst.tolist())), pairs)
+
 class TestGrnd(unittest.TestCase):
     """ Unit tests for random graph with n nodes and d degree """
     def test_grnd_n0_d0(self):
@@ -198,6 +259,44 @@ class TestGrnd(unittest.TestCase):
             gen_graph.main(argv)
             self.assertEqual(redirect.getvalue(), '3 3\n0 1\n0 2\n1 2\n')
 
+class TestGrndNumpy(unittest.TestCase):
+    """ Unit tests for random regular graph using numpy configuration model """
+    def test_grnd_numpy_n0_d0(self):
+        """ Test grnd numpy n=0 d=0 """
+        argv = ['-grnd', '-n', '0', '-d', '0', '--engine', 'numpy']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(),
+                             'Error: the 0 <= d < n inequality must be satisfied\n')
+    def test_grnd_numpy_n3_d1(self):
+        """ Test grnd numpy n=3 d=1 """
+        argv = ['-grnd', '-n', '3', '-d', '1', '--engine', 'numpy']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), 'Error: n * d must be even\n')
+    def test_grnd_numpy_n3_d2(self):
+        """ Test grnd numpy n=3 d=2 """
+        argv = ['-grnd', '-n', '3', '-d', '2', '--engine', 'numpy']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '3 3\n0 1\n0 2\n1 2\n')
+    def test_grnd_numpy_regular(self):
+        """ Test grnd numpy gives simple regular graphs, sparse and dense """
+        for num_node, degree in [(1000, 7), (100, 3), (50, 47), (21, 10)]:
+            for seed in range(3):
+                graph = gen_graph.regular_edge_arrays(num_node, degree, seed=seed)
+                nodes = gen_graph.np.concatenate((graph.src, graph.dst))
+                self.assertTrue((gen_graph.np.bincount(nodes, minlength=num_node) == degree).all())
+                edges = set(zip(graph.src.tolist(), graph.dst.tolist()))
+                self.assertEqual(len(edges), graph.num_edges)
+                self.assertTrue(all(u < v for u, v in edges))
+    def test_grnd_numpy_seed(self):
+        """ Test grnd numpy is reproducible with a seed """
+        graph1 = gen_graph.regular_edge_arrays(100, 4, seed=5)
+        graph2 = gen_graph.regular_edge_arrays(100, 4, seed=5)
+        self.assertEqual(graph1.src.tolist(), graph2.src.tolist())
+        self.assertEqual(graph1.dst.tolist(), graph2.dst.tolist())
+
 class TestGrnp(unittest.TestCase):
     """ Unit tests for random graph with n nodes and p edge creation probability """
     def test_grnp_n0_p0(self):
@@ -220,19 +319,19 @@ class TestGrnp(unittest.TestCase):
             self.assertEqual(redirect.getvalue(), '2 0\n')
     def test_grnp_n2_p0p5_seed0(self):
         """ Test grnp n=2 p=0.5 seed=0 """
-        argv = ['-grnp', '-n', '2', '-p', '0.5', '--seed', '0']
+        argv = ['-grnp', '-n', '2', '-p', '0.5', '--seed', '0', '--exact-networkx']
         with patch('sys.stdout', new=StringIO()) as redirect:
             gen_graph.main(argv)
             self.assertEqual(redirect.getvalue(), '2 0\n')
     def test_grnp_n2_p0p5_seed1(self):
         """ Test grnp n=2 p=0.5 seed=1 """
-        argv = ['-grnp', '-n', '2', '-p', '0.5', '--seed', '1']
+        argv = ['-grnp', '-n', '2', '-p', '0.5', '--seed', '1', '--exact-networkx']
         with patch('sys.stdout', new=StringIO()) as redirect:
             gen_graph.main(argv)
             self.assertEqual(redirect.getvalue(), '2 1\n0 1\n')
     def test_grnp_n2_p0p5_base1_seed1(self):
         """ Test grnp n=2 p=0.5 base=1 seed=1 """
-        argv = ['-grnp', '-n', '2', '-p', '0.5', '--one', '--seed', '1']
+        argv = ['-grnp', '-n', '2', '-p', '0.5', '--one', '--seed', '1', '--exact-networkx']
         with patch('sys.stdout', new=StringIO()) as redirect:
             gen_graph.main(argv)
             self.assertEqual(redirect.getvalue(), '2 1\n1 2\n')
@@ -249,6 +348,73 @@ class TestGrnp(unittest.TestCase):
             gen_graph.main(argv)
             self.assertEqual(redirect.getvalue(), '2 2\n0 1\n1 0\n')
 
+class TestConnected(unittest.TestCase):
+    """ Unit tests for connected random graphs from a spanning tree """
+    def test_connected_grnm_n6_m4(self):
+        """ Test connected grnm needs at least n-1 edges """
+        argv = ['-grnm', '-n', '6', '-m', '4', '--connected']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(),
+                             'Error: a connected graph with 6 nodes needs at least 5 edges\n')
+    def test_connected_grnm(self):
+        """ Test connected grnm has m distinct edges and is connected """
+        import networkx as nx
+        for seed in range(10):
+            for directed in [False, True]:
+                graph = gen_graph.gnm_edge_arrays(40, 45, seed=seed, directed=directed,
+                                                  connected=True)
+                ref = graph.to_networkx(nx)
+                self.assertEqual(ref.number_of_edges(), 45)
+                if directed:
+                    self.assertEqual(len(nx.descendants(ref, 0)), 39)
+                else:
+                    self.assertTrue(nx.is_connected(ref))
+    def test_connected_grnp(self):
+        """ Test connected grnp contains the random tree of the same seed """
+        import networkx as nx
+        graph = gen_graph.gnp_edge_arrays(60, 0.01, seed=4, connected=True)
+        tree = gen_graph.random_tree_edge_arrays(60, seed=4)
+        ref = graph.to_networkx(nx)
+        self.assertTrue(nx.is_connected(ref))
+        self.assertTrue(all(ref.has_edge(u, v) for u, v in zip(tree.src, tree.dst)))
+    def test_connected_skip_index(self):
+        """ Test indices without excluded values map to the kept values """
+        np = gen_graph.np
+        kept = gen_graph.skip_index(np.arange(6), np.array([0, 2, 3, 7]))
+        self.assertEqual(kept.tolist(), [1, 4, 5, 6, 8, 9])
+    def test_connected_type(self):
+        """ Test --connected is only supported by grnm and grnp with numpy """
+        for argv in [['-grnd', '-n', '4', '-d', '2', '--connected'],
+                     ['-grnm', '-n', '4', '-m', '4', '--connected', '--engine', 'networkx']]:
+            with patch('sys.stderr', new=StringIO()):
+                with self.assertRaises(SystemExit):
+                    gen_graph.main(argv)
+
+class TestGrnpNumpy(unittest.TestCase):
+    """ Unit tests for random graph with n nodes and p probability using skip sampling """
+    def test_grnp_numpy_n2_p1_dir(self):
+        """ Test grnp numpy n=2 p=1 directed """
+        argv = ['-grnp', '-n', '2', '-p', '1', '--dir', '--engine', 'numpy']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '2 2\n0 1\n1 0\n')
+    def test_grnp_numpy_n6_p0p5_seed0(self):
+        """ Test grnp numpy n=6 p=0.5 seed=0 """
+        argv = ['-grnp', '-n', '6', '-p', '0.5', '--seed', '0']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '6 7\n0 2\n0 3\n0 4\n0 5\n1 4\n2 5\n3 5\n')
+    def test_grnp_numpy_sparse(self):
+        """ Test grnp numpy n=2000 p=0.001 gives distinct sorted edges near the expected count """
+        for directed in [False, True]:
+            graph = gen_graph.gnp_edge_arrays(2000, 0.001, seed=1, directed=directed)
+            edges = list(zip(graph.src.tolist(), graph.dst.tolist()))
+            expected = gen_graph.num_edge_slots(2000, directed) * 0.001
+            self.assertLess(abs(len(edges) - expected), 5 * expected ** 0.5)
+            self.assertEqual(edges, sorted(set(edges)))
+            self.assertTrue(all(u != v and (directed or u < v) for u, v in edges))
+
 class TestGkn(unittest.TestCase):
     """ Unit tests for complete graph with n nodes """
     def test_gkn_n0(self):
@@ -388,6 +554,181 @@ class TestTrn(unittest.TestCase):
             gen_graph.main(argv)
             self.assertEqual(redirect.getvalue(), '3 2\n0 1\n0 2\n')
 
+class TestTrnNumpy(unittest.TestCase):
+    """ Unit tests for random tree with n nodes from a Prufer sequence """
+    def test_trn_numpy_n0(self):
+        """ Test trn numpy n=0 """
+        argv = ['-trn', '-n', '0', '--engine', 'numpy']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(),
+                             'Error: the null graph is not a tree\n')
+    def test_trn_numpy_n2_dir(self):
+        """ Test trn numpy n=2 directed """
+        argv = ['-trn', '-n', '2', '--dir']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '2 1\n0 1\n')
+    def test_trn_networkx_dir(self):
+        """ Test networkx engine rejects directed random trees """
+        argv = ['-trn', '-n', '3', '--dir', '--engine', 'networkx']
+        with patch('sys.stderr', new=StringIO()):
+            with self.assertRaises(SystemExit):
+                gen_graph.main(argv)
+    def test_trn_numpy_decode(self):
+        """ Test Prufer decoding gives the tree of networkx from_prufer_sequence """
+        import networkx as nx
+        for seq in [[3, 3, 3], [0, 1, 2, 3], [4, 0, 4, 1, 5], [2, 2, 0, 0]]:
+            num_node = len(seq) + 2
+            parent = gen_graph.decode_prufer(gen_graph.np.array(seq, dtype=gen_graph.np.int32), num_node)
+            edges = {frozenset((v, int(parent[v]))) for v in range(num_node - 1)}
+            tree = nx.from_prufer_sequence(seq)
+            self.assertEqual(edges, {frozenset(e) for e in tree.edges()})
+    def test_trn_numpy_rooted(self):
+        """ Test trn numpy edges point from parents to children 1 to n-1 """
+        import networkx as nx
+        graph = gen_graph.random_tree_edge_arrays(1000, seed=2, directed=True)
+        self.assertEqual(graph.dst.tolist(), list(range(1, 1000)))
+        tree = graph.to_networkx(nx)
+        self.assertTrue(nx.is_arborescence(tree))
+        self.assertEqual(tree.in_degree(0), 0)
+
+class TestGba(unittest.TestCase):
+    """ Unit tests for Barabasi-Albert graph with n nodes and m edges per new node """
+    def test_gba_n5_m5(self):
+        """ Test gba n=5 m=5 """
+        argv = ['-gba', '-n', '5', '-m', '5']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(),
+                             'Error: Barabasi-Albert network must have m >= 1 and m < n, '
+                             'm = 5, n = 5\n')
+    def test_gba_n4_m3(self):
+        """ Test gba n=4 m=3 is a star """
+        argv = ['-gba', '-n', '4', '-m', '3', '--seed', '0']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '4 3\n0 1\n0 2\n0 3\n')
+    def test_gba_simple(self):
+        """ Test gba has (n-m)*m distinct edges, new nodes attached to earlier nodes, also
+        when dense graphs redraw targets copied through long chains
+        """
+        for num_node, degree, seed in [(2000, 3, 4), (400, 100, 1), (60, 50, 2)]:
+            graph = gen_graph.barabasi_albert_edge_arrays(num_node, degree, seed=seed)
+            self.assertEqual(graph.number_of_edges(), (num_node - degree) * degree)
+            src, dst = graph.src.astype(int), graph.dst.astype(int)
+            self.assertEqual(len({(u, v) for u, v in zip(src, dst)}), len(src))
+            self.assertTrue((src[degree:] > dst[degree:]).all())
+            out_degree = gen_graph.np.bincount(src[degree:], minlength=num_node)
+            self.assertTrue((out_degree[degree + 1:] == degree).all())
+    def test_gba_seed(self):
+        """ Test gba is repeatable with a seed """
+        first = gen_graph.generate('gba', n=300, m=2, seed=7, array=True)
+        second = gen_graph.generate('gba', n=300, m=2, seed=7, array=True)
+        self.assertTrue((first == second).all())
+
+class TestGpl(unittest.TestCase):
+    """ Unit tests for Chung-Lu graph with power-law expected degrees """
+    def test_gpl_gamma1(self):
+        """ Test gpl gamma=1 """
+        argv = ['-gpl', '-n', '5', '-gamma', '1', '-avgdeg', '2']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), 'Error: gamma must be greater than 1\n')
+    def test_gpl_avgdeg0(self):
+        """ Test gpl avgdeg=0 """
+        argv = ['-gpl', '-n', '5', '-gamma', '2.5', '-avgdeg', '0']
+        with patch('sys.stdout', new=StringIO()) as redirect, warnings.catch_warnings():
+            warnings.simplefilter('error')
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '5 0\n')
+    def test_gpl_simple(self):
+        """ Test gpl edges are sorted, without self loops or multi-edges """
+        for directed in [False, True]:
+            graph = gen_graph.chung_lu_edge_arrays(5000, 2.5, 8, seed=1, directed=directed)
+            keys = graph.src.astype(int) * 5000 + graph.dst
+            self.assertTrue((gen_graph.np.diff(keys) > 0).all())
+            self.assertFalse((graph.src == graph.dst).any())
+            if not directed:
+                self.assertTrue((graph.src < graph.dst).all())
+    def test_gpl_degrees(self):
+        """ Test gpl average degree and heavy tail """
+        num_node = 20000
+        graph = gen_graph.chung_lu_edge_arrays(num_node, 2.5, 10, seed=2)
+        degree = gen_graph.np.bincount(gen_graph.np.concatenate((graph.src, graph.dst)),
+                                       minlength=num_node)
+        self.assertAlmostEqual(degree.mean(), 10, delta=1.0)
+        self.assertGreater(degree[:10].mean(), 10 * degree[-10000:].mean())
+    def test_gpl_directed_networkx(self):
+        """ Test directed gpl is rejected with the networkx engine """
+        argv = ['-gpl', '-n', '5', '-gamma', '2.5', '-avgdeg', '2', '--directed',
+                '--engine', 'networkx']
+        with patch('sys.stderr', new=StringIO()):
+            with self.assertRaises(SystemExit):
+                gen_graph.parse_arguments(argv)
+
+class TestGws(unittest.TestCase):
+    """ Unit tests for Watts-Strogatz graph with n nodes, k neighbors and p rewiring """
+    def test_gws_n4_k5(self):
+        """ Test gws n=4 k=5 """
+        argv = ['-gws', '-n', '4', '-k', '5', '-p', '0.5']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), 'Error: k>n, choose smaller k or larger n\n')
+    def test_gws_p0(self):
+        """ Test gws p=0 is a ring lattice """
+        argv = ['-gws', '-n', '5', '-k', '2', '-p', '0']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '5 5\n0 1\n0 4\n1 2\n2 3\n3 4\n')
+    def test_gws_simple(self):
+        """ Test gws keeps n*(k//2) edges without self loops or multi-edges """
+        for prob in [0.2, 1.0]:
+            graph = gen_graph.watts_strogatz_edge_arrays(1000, 7, prob, seed=3)
+            self.assertEqual(graph.number_of_edges(), 3000)
+            keys = graph.src.astype(int) * 1000 + graph.dst
+            self.assertTrue((gen_graph.np.diff(keys) > 0).all())
+            self.assertTrue((graph.src < graph.dst).all())
+    def test_gws_saturated(self):
+        """ Test gws ends when rewired nodes are joined to all others """
+        graph = gen_graph.watts_strogatz_edge_arrays(5, 4, 1.0, seed=0)
+        self.assertEqual(graph.number_of_edges(), 10)
+
+class TestGrg(unittest.TestCase):
+    """ Unit tests for random geometric graph with n nodes and radius r """
+    def test_grg_n0(self):
+        """ Test grg n=0 """
+        argv = ['-grg', '-n', '0', '-r', '0.5']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '0 0\n')
+    def test_grg_all_pairs(self):
+        """ Test grg finds the same edges as checking all pairs """
+        np = gen_graph.np
+        for num_node, radius in [(400, 0.1), (200, 0.5), (30, 2.0), (800, 0.01)]:
+            graph = gen_graph.geometric_edge_arrays(num_node, radius, seed=5, distance=True)
+            pos = gen_graph.make_rng(5).random((num_node, 2))
+            dist = np.sqrt(((pos[:, None] - pos[None]) ** 2).sum(axis=2))
+            src, dst = np.nonzero(np.triu(dist <= radius, 1))
+            self.assertEqual(graph.src.tolist(), src.tolist())
+            self.assertEqual(graph.dst.tolist(), dst.tolist())
+            self.assertTrue(np.allclose(graph.weight, dist[src, dst], atol=1e-6))
+    def test_grg_distance_weights(self):
+        """ Test grg writes distance weights as floats """
+        argv = ['-grg', '-n', '50', '-r', '0.3', '--seed', '1', '--distance-weights']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            lines = redirect.getvalue().splitlines()
+        weights = [float(line.split()[2]) for line in lines[1:]]
+        self.assertTrue(weights and all(0 <= w <= 0.3 for w in weights))
+    def test_grg_distance_weights_type(self):
+        """ Test --distance-weights is only for -grg with float weights """
+        for argv in [['-gws', '-n', '5', '-k', '2', '-p', '0', '--distance-weights'],
+                     ['-grg', '-n', '5', '-r', '0.1', '-w', 'int', '--distance-weights']]:
+            with patch('sys.stderr', new=StringIO()):
+                with self.assertRaises(SystemExit):
+                    gen_graph.main(argv)
+
 class TestTch(unittest.TestCase):
     """ Unit tests for full c-ary tree with h height """
     def test_tch_c0_h0(self):
@@ -520,5 +861,779 @@ class TestTcn(unittest.TestCase):
             gen_graph.main(argv)
             self.assertEqual(redirect.getvalue(), '7 6\n0 1\n0 2\n1 3\n1 4\n2 5\n2 6\n')
 
+class TestDeterministicNumpy(unittest.TestCase):
+    """ Unit tests for deterministic graphs built directly as arrays """
+    def run_engine(self, argv, engine):
+        """ Run gen_graph with an engine and return the output """
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv + ['--engine', engine])
+            return redirect.getvalue()
+    def test_same_as_networkx(self):
+        """ Test gkn gcn gpn tcn tch numpy output equals networkx output """
+        for extra in [[], ['--dir'], ['-w', 'int', '--seed', '1', '--legacy-weights']]:
+            for n in range(7):
+                for graph in [['-gkn'], ['-gcn'], ['-gpn'], ['-tcn', '-c', str(n % 4)]]:
+                    argv = graph + ['-n', str(n)] + extra
+                    self.assertEqual(self.run_engine(argv, 'numpy'),
+                                     self.run_engine(argv, 'networkx'), argv)
+            for c in range(4):
+                argv = ['-tch', '-c', str(c), '-h', '3'] + extra
+                self.assertEqual(self.run_engine(argv, 'numpy'),
+                                 self.run_engine(argv, 'networkx'), argv)
+    def test_gkn_stream_weights(self):
+        """ Test gkn lazy weights are the same for any chunk size and pass """
+        args = gen_graph.parse_arguments(['-gkn', '-n', '100', '-w', 'float', '--seed', '2'])
+        graph = gen_graph.gen_graph(None, args)
+        first = [w for _, _, chunk in graph.chunks(7) for w in chunk.tolist()]
+        second = [w for _, _, chunk in graph.chunks() for w in chunk.tolist()]
+        self.assertEqual(len(first), 4950)
+        self.assertEqual(first, second)
+
+class TestStartup(unittest.TestCase):
+    """ Unit tests for lazy networkx import """
+    def test_numpy_engine_without_networkx(self):
+        """ Test the numpy engine runs when networkx cannot be imported """
+        argv = ['-gpn', '-n', '3', '-w', 'int', '--seed', '1']
+        with patch.dict('sys.modules', {'networkx': None}):
+            with patch('sys.stdout', new=StringIO()) as redirect:
+                gen_graph.main(argv)
+                self.assertEqual(redirect.getvalue().splitlines()[0], '3 2')
+    def test_profile_startup(self):
+        """ Test --profile-startup reports parse time on stderr only """
+        argv = ['-gkn', '-n', '2', '--profile-startup']
+        with patch('sys.stdout', new=StringIO()) as redirect, \
+             patch('sys.stderr', new=StringIO()) as stderr:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '2 1\n0 1\n')
+            self.assertIn('parse arguments', stderr.getvalue())
+            self.assertIn('skip networkx', stderr.getvalue())
+
+class TestApi(unittest.TestCase):
+    """ Unit tests for the generate() library API """
+    def test_api_same_as_cli(self):
+        """ Test generate() tuples equal the command line edge list """
+        argv = ['-grnm', '-n', '20', '-m', '30', '--seed', '4', '-w', 'float', '--dir']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            lines = redirect.getvalue().splitlines()[1:]
+        edges = gen_graph.generate('grnm', n=20, m=30, seed=4, weights='float', directed=True)
+        self.assertEqual(['%d %d %s' % edge for edge in edges], lines)
+    def test_api_array(self):
+        """ Test generate() returns an edge array without printing """
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            array = gen_graph.generate('gpn', n=4, one_based=True, array=True)
+            self.assertEqual(redirect.getvalue(), '')
+        self.assertEqual(array.tolist(), [[1, 2], [2, 3], [3, 4]])
+    def test_api_errors(self):
+        """ Test generate() raises instead of exiting or printing """
+        with self.assertRaises(ValueError):
+            gen_graph.generate('grnm', n=5)
+        with self.assertRaises(ValueError):
+            gen_graph.generate('grnx', n=5)
+        with self.assertRaises(gen_graph.GraphError):
+            gen_graph.generate('gcn', n=0)
+
+class TestWeights(unittest.TestCase):
+    """ Unit tests for edge weights drawn in one batch """
+    def test_weights_int_seed0(self):
+        """ Test grnm n=4 m=4 seed=0 w=int """
+        argv = ['-grnm', '-n', '4', '-m', '4', '--seed', '0', '-w', 'int', '-wmin', '3', '-wmax', '4']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '4 4\n0 2 4\n0 1 4\n1 2 4\n2 3 4\n')
+    def test_weights_float_seed0(self):
+        """ Test grnm n=4 m=4 seed=0 w=float """
+        argv = ['-grnm', '-n', '4', '-m', '4', '--seed', '0', '-w', 'float']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '4 4\n0 2 88.97\n0 1 55.71\n1 2 80.09\n2 3 95.65\n')
+    def test_weights_exact_networkx(self):
+        """ Test --exact-networkx keeps legacy weights """
+        argv = ['-grnm', '-n', '3', '-m', '1', '--dir', '--seed', '0', '-w', 'int', '--exact-networkx']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue(), '3 1\n0 1 49\n')
+    def test_weights_range(self):
+        """ Test batch weights stay in range with 2 decimal digits """
+        args = gen_graph.parse_arguments(['-gkn', '-n', '3', '-w', 'float', '-wmin', '-1', '-wmax', '1'])
+        weights = gen_graph.random_weights(args, 10000)
+        self.assertTrue(((weights >= -1) & (weights <= 1)).all())
+        self.assertTrue((abs(weights * 100 - (weights * 100).round()) < 1e-6).all())
+        args.w = 'int'
+        self.assertEqual(set(gen_graph.random_weights(args, 10000).tolist()), {-1, 0, 1})
+
+class TestOutput(unittest.TestCase):
+    """ Unit tests for edge list output """
+    def test_output_file(self):
+        """ Test output to a file """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'g.txt')
+            argv = ['-gpn', '-n', '3', '--one', '--output', filename]
+            with patch('sys.stdout', new=StringIO()) as redirect:
+                gen_graph.main(argv)
+                self.assertEqual(redirect.getvalue(), 'Saved edge list in %s\n' % filename)
+            with open(filename) as fin:
+                self.assertEqual(fin.read(), '3 2\n1 2\n2 3\n')
+    def test_output_chunks(self):
+        """ Test edges split into chunks are written in order """
+        graph = gen_graph.gnm_edge_arrays(6, 15)
+        chunks = list(graph.chunks(size=4))
+        self.assertEqual([len(src) for src, _, _ in chunks], [4, 4, 4, 3])
+        text = ''.join(gen_graph.format_edge_chunk(src, dst, weight, 0) for src, dst, weight in chunks)
+        self.assertEqual(text.splitlines(), ['%d %d' % (u, v) for u in range(6) for v in range(u + 1, 6)])
+    def test_output_npy(self):
+        """ Test npy output of a weighted one-based graph """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'g.npy')
+            argv = ['-gpn', '-n', '3', '--one', '-w', 'int', '-wmin', '5', '-wmax', '5',
+                    '--format', 'npy', '--output', filename]
+            with patch('sys.stdout', new=StringIO()):
+                gen_graph.main(argv)
+            edges = gen_graph.np.load(filename, mmap_mode='r')
+            self.assertEqual(edges.tolist(), [[1, 2, 5], [2, 3, 5]])
+    def test_output_npz_csr(self):
+        """ Test npz csr output of a directed graph """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'g.npz')
+            argv = ['-gkn', '-n', '3', '--dir', '--format', 'npz-csr', '--output', filename]
+            with patch('sys.stdout', new=StringIO()):
+                gen_graph.main(argv)
+            with gen_graph.np.load(filename) as csr:
+                self.assertEqual(csr['indptr'].tolist(), [0, 2, 4, 6])
+                self.assertEqual(csr['indices'].tolist(), [1, 2, 0, 2, 0, 1])
+                self.assertEqual(int(csr['num_nodes']), 3)
+                self.assertNotIn('weights', csr)
+    def test_output_bin(self):
+        """ Test bin output header and edge records """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'g.bin')
+            argv = ['-gcn', '-n', '3', '-w', 'float', '-wmin', '1.5', '-wmax', '1.5',
+                    '--format', 'bin', '--output', filename]
+            with patch('sys.stdout', new=StringIO()):
+                gen_graph.main(argv)
+            with open(filename, 'rb') as fin:
+                header = gen_graph.BIN_HEADER.unpack(fin.read(gen_graph.BIN_HEADER.size))
+            self.assertEqual(header, (gen_graph.BIN_MAGIC, 1, 4, 2, 0, 3, 3))
+            records = gen_graph.np.memmap(filename, dtype=gen_graph.bin_record_dtype(4, 2), mode='r',
+                                          offset=gen_graph.BIN_HEADER.size)
+            self.assertEqual(records.tolist(), [(0, 1, 1.5), (0, 2, 1.5), (1, 2, 1.5)])
+    def test_output_binary_stdout(self):
+        """ Test binary formats require an output file """
+        argv = ['-gpn', '-n', '3', '--format', 'bin']
+        with patch('sys.stderr', new=StringIO()):
+            with self.assertRaises(SystemExit):
+                gen_graph.main(argv)
+
+class TestBatch(unittest.TestCase):
+    """ Unit tests for batch mode """
+    def test_batch_jsonl(self):
+        """ Test jobs of a JSONL manifest as objects, lists and strings """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = lambda name: os.path.join(tmpdir, name)
+            with open(path('jobs.jsonl'), 'w') as fout:
+                fout.write('{"gpn": true, "n": 3, "one-based": true, "output": "%s"}\n' % path('a.txt'))
+                fout.write('["-gkn", "-n", "3", "--output", "%s"]\n' % path('b.txt'))
+                fout.write('"-gcn -n 0 --output %s"\n' % path('c.txt'))
+                fout.write('{"bogus": 1}\n{"gpn": true,\n5\n')
+            with patch('sys.stdout', new=StringIO()) as redirect:
+                gen_graph.main(['--batch', path('jobs.jsonl')])
+                summary = redirect.getvalue().splitlines()
+            with open(path('a.txt')) as fin:
+                self.assertEqual(fin.read(), '3 2\n1 2\n2 3\n')
+            with open(path('b.txt')) as fin:
+                self.assertEqual(fin.read(), '3 3\n0 1\n0 2\n1 2\n')
+            self.assertFalse(os.path.exists(path('c.txt')))
+            self.assertEqual([line.split()[1] for line in summary[-7:-1]],
+                             ['ok', 'ok', 'failed', 'failed', 'failed', 'failed'])
+            self.assertEqual(summary[-1], '2 of 6 jobs succeeded')
+            self.assertIn('Error: unknown option: bogus', summary)
+    def test_batch_missing(self):
+        """ Test a missing manifest is a usage error """
+        with patch('sys.stderr', new=StringIO()):
+            with self.assertRaises(SystemExit):
+                gen_graph.parse_arguments(['--batch', 'missing.jsonl'])
+    def test_batch_csv(self):
+        """ Test jobs of a CSV manifest with flags and empty cells """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = lambda name: os.path.join(tmpdir, name)
+            with open(path('jobs.csv'), 'w') as fout:
+                fout.write('grnp,n,p,directed,output\n')
+                fout.write('true,2,1,yes,%s\n' % path('a.txt'))
+                fout.write('true,2,1,,%s\n' % path('b.txt'))
+            with patch('sys.stdout', new=StringIO()) as redirect:
+                gen_graph.main(['--batch', path('jobs.csv')])
+                self.assertIn('2 of 2 jobs succeeded', redirect.getvalue())
+            with open(path('a.txt')) as fin:
+                self.assertEqual(fin.read(), '2 2\n0 1\n1 0\n')
+            with open(path('b.txt')) as fin:
+                self.assertEqual(fin.read(), '2 1\n0 1\n')
+
+class TestSeedSweep(unittest.TestCase):
+    """ Unit tests for seed sweeps and parallel jobs """
+    def test_sweep_jobs(self):
+        """ Test a seed sweep in a process pool matches seeded runs """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            template = os.path.join(tmpdir, '{type}_n{n}_seed{seed}.txt')
+            argv = ['-grnm', '-n', '6', '-m', '5', '--seed-range', '3:6', '--jobs', '2',
+                    '--output', template]
+            with patch('sys.stdout', new=StringIO()) as redirect:
+                gen_graph.main(argv)
+                self.assertIn('3 of 3 jobs succeeded', redirect.getvalue())
+            for seed in range(3, 6):
+                argv = ['-grnm', '-n', '6', '-m', '5', '--seed', str(seed)]
+                with patch('sys.stdout', new=StringIO()) as redirect:
+                    gen_graph.main(argv)
+                with open(os.path.join(tmpdir, 'grnm_n6_seed%d.txt' % seed)) as fin:
+                    self.assertEqual(fin.read(), redirect.getvalue())
+    def test_sweep_failure(self):
+        """ Test a failing job does not stop other jobs """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            template = os.path.join(tmpdir, 'g{seed}.txt')
+            open(template.format(seed=1), 'w').close()
+            argv = ['-gpn', '-n', '3', '--seed-range', '0:3', '--output', template]
+            with patch('sys.stdout', new=StringIO()) as redirect:
+                gen_graph.main(argv)
+                summary = redirect.getvalue().splitlines()
+            self.assertEqual([line.split()[1] for line in summary[-4:-1]], ['ok', 'failed', 'ok'])
+            self.assertTrue(os.path.exists(template.format(seed=2)))
+    def test_sweep_seed_conflict(self):
+        """ Test --seed and --seed-range cannot be used together """
+        argv = ['-gpn', '-n', '3', '--seed', '1', '--seed-range', '0:3']
+        with patch('sys.stderr', new=StringIO()):
+            with self.assertRaises(SystemExit):
+                gen_graph.main(argv)
+    def test_sweep_default_output(self):
+        """ Test default file names of seed sweeps, -tch named by children and height """
+        args = gen_graph.parse_arguments(['-tch', '-c', '2', '-h', '3', '--seed-range', '0:2'])
+        self.assertEqual([label for label, _ in gen_graph.sweep_jobs(args)],
+                         ['seed 0 -> tch_c2_h3_seed0.txt', 'seed 1 -> tch_c2_h3_seed1.txt'])
+        args = gen_graph.parse_arguments(['-gpn', '-n', '4', '--seed-range', '5:6',
+                                          '--format', 'npy'])
+        self.assertEqual(gen_graph.sweep_output(args, 5), 'gpn_n4_seed5.npy')
+    def test_sweep_template(self):
+        """ Test output templates with unknown fields or without a file per seed are rejected """
+        for template in ['g.txt', 'g_{n}.txt', 'x_{bogus}.txt', 'x_{0}.txt', 'x_{seed.txt']:
+            argv = ['-gpn', '-n', '3', '--seed-range', '0:3', '--output', template]
+            with patch('sys.stderr', new=StringIO()):
+                with self.assertRaises(SystemExit):
+                    gen_graph.parse_arguments(argv)
+
+class TestMaxMemory(unittest.TestCase):
+    """ Unit tests for generation within a memory budget """
+    def test_max_memory_partitions(self):
+        """ Test -grnm over --max-memory streams partitions like --partitions """
+        argv = ['-grnm', '-n', '1000', '-m', '40000', '--seed', '3', '-w', 'int']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv + ['--partitions', '2'])
+            expected = redirect.getvalue()
+        with patch('sys.stdout', new=StringIO()) as redirect, \
+             patch('sys.stderr', new=StringIO()) as stderr:
+            gen_graph.main(argv + ['--max-memory', '1'])
+            self.assertEqual(redirect.getvalue(), expected)
+            self.assertIn('generating 2 partitions', stderr.getvalue())
+            self.assertIn('differs from the in-memory graph', stderr.getvalue())
+    def test_max_memory_partitions_output(self):
+        """ Test --partitions written to files are raised to the count that fits the budget """
+        argv = ['-grnm', '-n', '1000', '-m', '100000', '--seed', '1', '--partitions', '2']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv + ['--max-memory', '1'])
+            expected = redirect.getvalue()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'g.txt')
+            with patch('sys.stdout', new=StringIO()), \
+                 patch('sys.stderr', new=StringIO()) as stderr:
+                gen_graph.main(argv + ['--max-memory', '1', '--output', filename, '--concat'])
+                self.assertIn('generating 4 partitions', stderr.getvalue())
+            with open(filename) as fin:
+                self.assertEqual(fin.read(), expected)
+    def test_max_memory_in_memory(self):
+        """ Test small graphs are generated in memory as without a budget """
+        argv = ['-grnd', '-n', '10', '-d', '3', '--seed', '1', '--engine', 'numpy']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            expected = redirect.getvalue()
+        with patch('sys.stdout', new=StringIO()) as redirect, \
+             patch('sys.stderr', new=StringIO()) as stderr:
+            gen_graph.main(argv + ['--max-memory', '1'])
+            self.assertEqual(redirect.getvalue(), expected)
+            self.assertIn('generating in memory', stderr.getvalue())
+    def test_regular_buckets(self):
+        """ Test a regular graph spilled to bucket files is simple, regular and sorted """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            graph = gen_graph.regular_edge_arrays(500, 6, seed=2, buckets=4, spill_dir=tmpdir)
+            edges = [edge for src, dst, _ in graph.chunks(100)
+                     for edge in zip(src.tolist(), dst.tolist())]
+            self.assertEqual(len(edges), 1500)
+            self.assertEqual(edges, sorted(set(edges)))
+            self.assertTrue(all(u < v for u, v in edges))
+            degrees = gen_graph.np.bincount([node for edge in edges for node in edge])
+            self.assertEqual(set(degrees.tolist()), {6})
+            del graph
+            self.assertEqual(os.listdir(tmpdir), [])
+
+class TestStats(unittest.TestCase):
+    """ Unit tests for --stats and --profile """
+    def test_stats_stderr(self):
+        """ Test --stats prints stages to stderr and keeps stdout unchanged """
+        argv = ['-grnm', '-n', '10', '-m', '5', '--seed', '1', '-w', 'int']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            expected = redirect.getvalue()
+        with patch('sys.stdout', new=StringIO()) as redirect, \
+             patch('sys.stderr', new=StringIO()) as stderr:
+            gen_graph.main(argv + ['--stats'])
+            self.assertEqual(redirect.getvalue(), expected)
+            report = stderr.getvalue()
+        for name in ['parse arguments', 'generate', 'weights', 'output']:
+            self.assertIn(name, report)
+        self.assertIn('edges 5,', report)
+        self.assertIn('bytes written %d' % len(expected), report)
+    def test_stats_json_profile(self):
+        """ Test --stats FILE writes JSON and --profile dumps cProfile statistics """
+        import pstats
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, 'g.bin')
+            stats = os.path.join(tmpdir, 'stats.json')
+            profile = os.path.join(tmpdir, 'run.prof')
+            argv = ['-gpn', '-n', '100', '--output', output, '--format', 'bin',
+                    '--stats', stats, '--profile', profile]
+            with patch('sys.stdout', new=StringIO()):
+                gen_graph.main(argv)
+            with open(stats) as fin:
+                summary = gen_graph.json.load(fin)
+            self.assertEqual(summary['num_edges'], 99)
+            self.assertEqual(summary['bytes_written'], os.path.getsize(output))
+            self.assertIn('output', [s['stage'] for s in summary['stages']])
+            self.assertGreater(pstats.Stats(profile).total_calls, 0)
+
+class TestSummary(unittest.TestCase):
+    """ Unit tests for --summary """
+    def test_summary_networkx(self):
+        """ Test degree histogram and components are the same as networkx """
+        import networkx as nx
+        for seed in range(5):
+            for directed in [False, True]:
+                graph = gen_graph.gnm_edge_arrays(100, 80, seed=seed, directed=directed)
+                view = gen_graph.SummaryView(graph)
+                for _ in view.chunks(7):
+                    pass
+                report = view.summary.report()
+                ref = graph.to_networkx(nx)
+                components = nx.number_weakly_connected_components(ref) if directed \
+                    else nx.number_connected_components(ref)
+                self.assertEqual(report['degree_histogram'], nx.degree_histogram(ref))
+                self.assertEqual(report['weakly_connected_components'], components)
+    def test_summary_file(self):
+        """ Test --summary writes <output>.summary.json next to the edge list """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, 'g.txt.gz')
+            argv = ['-gcn', '-n', '10', '-w', 'float', '--seed', '3', '--output', output,
+                    '--summary']
+            with patch('sys.stdout', new=StringIO()):
+                gen_graph.main(argv)
+            with open(os.path.join(tmpdir, 'g.summary.json')) as fin:
+                summary = gen_graph.json.load(fin)
+        self.assertEqual(summary['num_edges'], 10)
+        self.assertEqual(summary['degree'], {'min': 2, 'max': 2, 'mean': 2.0})
+        self.assertEqual(summary['weakly_connected_components'], 1)
+        self.assertLessEqual(summary['weight']['min'], summary['weight']['mean'])
+    def test_summary_shards(self):
+        """ Test shard files are summarized once """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, 'g.txt')
+            summary = os.path.join(tmpdir, 's.json')
+            argv = ['-gpn', '-n', '20', '--output', output, '--shards', '3',
+                    '--summary', summary]
+            with patch('sys.stdout', new=StringIO()):
+                gen_graph.main(argv)
+            with open(summary) as fin:
+                summary = gen_graph.json.load(fin)
+        self.assertEqual(summary['num_edges'], 19)
+        self.assertEqual(summary['degree_histogram'], [0, 2, 18])
+        self.assertIsNone(summary['weight'])
+    def test_summary_stdout(self):
+        """ Test --summary needs a file name when writing to stdout """
+        with patch('sys.stderr', new=StringIO()):
+            with self.assertRaises(SystemExit):
+                gen_graph.main(['-gpn', '-n', '5', '--summary'])
+
+class TestCompression(unittest.TestCase):
+    """ Unit tests for compressed output files """
+    def test_gzip_text(self):
+        """ Test .gz output decompresses to the text output """
+        import gzip
+        argv = ['-grnm', '-n', '30', '-m', '40', '--seed', '1', '-w', 'float']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            expected = redirect.getvalue()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'g.txt.gz')
+            with patch('sys.stdout', new=StringIO()), \
+                 patch('gen_graph.COMPRESS_BLOCK_SIZE', 100):
+                gen_graph.main(argv + ['--output', filename, '--compress-level', '1'])
+            with gzip.open(filename, 'rt') as fin:
+                self.assertEqual(fin.read(), expected)
+    def test_compressed_shards(self):
+        """ Test shards keep the compressed extension last """
+        self.assertEqual(gen_graph.shard_filename('g.txt.gz', 3), 'g.3.txt.gz')
+        self.assertEqual(gen_graph.manifest_filename('g.bin.lz4'), 'g.manifest.json')
+    def test_compress_level_range(self):
+        """ Test --compress-level is checked against the codec """
+        for argv in [['--output', 'g.txt.gz', '--compress-level', '10'],
+                     ['--output', 'g.txt', '--compress-level', '1'],
+                     ['--output', 'g.npz.gz', '--format', 'npz-csr']]:
+            with patch('sys.stderr', new=StringIO()):
+                with self.assertRaises(SystemExit):
+                    gen_graph.parse_arguments(['-gpn', '-n', '3'] + argv)
+
+class TestCache(unittest.TestCase):
+    """ Unit tests for the cache of seeded outputs """
+    def test_cache_hit(self):
+        """ Test a cache hit is served without generating the graph again """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = os.path.join(tmpdir, 'cache')
+            argv = ['-grnm', '-n', '8', '-m', '6', '--seed', '2', '-w', 'int', '--cache', cache]
+            with patch('sys.stdout', new=StringIO()) as redirect:
+                gen_graph.main(argv)
+                expected = redirect.getvalue()
+            self.assertEqual(len(os.listdir(cache)), 1)
+            with patch('gen_graph.gen_graph') as generate:
+                output = os.path.join(tmpdir, 'g.txt')
+                with patch('sys.stdout', new=StringIO()) as redirect:
+                    gen_graph.main(argv)
+                    self.assertEqual(redirect.getvalue(), expected)
+                with patch('sys.stdout', new=StringIO()):
+                    gen_graph.main(argv + ['--output', output])
+                generate.assert_not_called()
+            with open(output) as fin:
+                self.assertEqual(fin.read(), expected)
+    def test_cache_key(self):
+        """ Test cache keys ignore the output file but not the seed """
+        args = gen_graph.parse_arguments(['-gpn', '-n', '3', '--seed', '1', '--cache', 'c'])
+        other = gen_graph.parse_arguments(['-gpn', '-n', '3', '--seed', '1', '--output', 'g'])
+        self.assertEqual(gen_graph.cache_key(args), gen_graph.cache_key(other))
+        other.seed = 2
+        self.assertNotEqual(gen_graph.cache_key(args), gen_graph.cache_key(other))
+    def test_cache_key_max_memory(self):
+        """ Test cache keys include the memory budget, which changes the seeded graph """
+        argv = ['-grnm', '-n', '2000', '-m', '50000', '--seed', '3', '--engine', 'numpy']
+        args = gen_graph.parse_arguments(argv)
+        budget = gen_graph.parse_arguments(argv + ['--max-memory', '1'])
+        self.assertNotEqual(gen_graph.cache_key(args), gen_graph.cache_key(budget))
+    def test_cache_unseeded(self):
+        """ Test unseeded runs bypass the cache """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            argv = ['-gpn', '-n', '3', '--cache', tmpdir]
+            with patch('sys.stdout', new=StringIO()):
+                gen_graph.main(argv)
+            self.assertEqual(os.listdir(tmpdir), [])
+    def test_cache_eviction(self):
+        """ Test least recently used files are evicted over --cache-size """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for seed, mtime in [(1, 100), (2, 300), (3, 200)]:
+                args = gen_graph.parse_arguments(['-gpn', '-n', '3', '--seed', str(seed),
+                                                  '--cache', tmpdir])
+                path = gen_graph.cache_filename(args)
+                with open(path, 'wb') as fout:
+                    fout.write(b'x' * (400 << 10))
+                os.utime(path, (mtime, mtime))
+            args.cache_size = 1
+            gen_graph.evict_cache(args)
+            self.assertEqual(len(os.listdir(tmpdir)), 2)
+            self.assertTrue(os.path.exists(path))
+            args.seed = 1
+            self.assertFalse(os.path.exists(gen_graph.cache_filename(args)))
+
+class TestPartitions(unittest.TestCase):
+    """ Unit tests for partitioned generation of -grnm and -grnp """
+    def test_partitions_grnm_jobs(self):
+        """ Test concatenated shards are identical for any number of jobs """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            outputs = []
+            for jobs in ['1', '3']:
+                filename = os.path.join(tmpdir, 'g%s.txt' % jobs)
+                argv = ['-grnm', '-n', '40', '-m', '200', '--seed', '7', '-w', 'int', '--partitions', '4',
+                        '--jobs', jobs, '--output', filename, '--concat']
+                with patch('sys.stdout', new=StringIO()):
+                    gen_graph.main(argv)
+                with open(filename) as fin:
+                    outputs.append(fin.read())
+            self.assertEqual(sorted(os.listdir(tmpdir)), ['g1.txt', 'g3.txt'])
+        argv = ['-grnm', '-n', '40', '-m', '200', '--seed', '7', '-w', 'int', '--partitions', '4']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            outputs.append(redirect.getvalue())
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(outputs[0], outputs[2])
+        lines = outputs[0].splitlines()
+        self.assertEqual(lines[0], '40 200')
+        self.assertEqual(len(set(tuple(line.split()[:2]) for line in lines[1:])), 200)
+    def test_partitions_grnp_shards(self):
+        """ Test shard files of -grnp each have a header """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'g.txt')
+            argv = ['-grnp', '-n', '30', '-p', '0.2', '--dir', '--seed', '1', '--partitions', '3',
+                    '--output', filename]
+            with patch('sys.stdout', new=StringIO()):
+                gen_graph.main(argv)
+            edges = []
+            for i in range(3):
+                with open(os.path.join(tmpdir, 'g.%d.txt' % i)) as fin:
+                    lines = fin.read().splitlines()
+                self.assertEqual(lines[0], '30 %d' % (len(lines) - 1))
+                edges += lines[1:]
+        argv = ['-grnp', '-n', '30', '-p', '0.2', '--dir', '--seed', '1', '--partitions', '3']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            self.assertEqual(redirect.getvalue().splitlines()[1:], edges)
+    def test_partitions_split_count(self):
+        """ Test split counts fit in partitions and add up """
+        rng = gen_graph.make_rng(0)
+        for sizes, count in [([5, 5, 5], 12), ([3 * 10 ** 9, 10 ** 9], 10 ** 6), ([3 * 10 ** 9, 10 ** 9], 3 * 10 ** 9)]:
+            counts = gen_graph.split_count(rng, sizes, count)
+            self.assertEqual(sum(counts), count)
+            self.assertTrue(all(0 <= c <= size for c, size in zip(counts, sizes)))
+    def test_partitions_visualize(self):
+        """ Test --visualize is rejected when partitions are written to files """
+        argv = ['-grnm', '-n', '6', '-m', '5', '--partitions', '2', '--output', 'v.txt',
+                '--visualize']
+        with patch('sys.stderr', new=StringIO()):
+            with self.assertRaises(SystemExit):
+                gen_graph.parse_arguments(argv)
+
+class TestShards(unittest.TestCase):
+    """ Unit tests for output sharded by source node """
+    def shard_edges(self, argv, filename):
+        """ Run argv and return the manifest and edge lines of all shards """
+        with patch('sys.stdout', new=StringIO()):
+            gen_graph.main(argv)
+        with open(gen_graph.manifest_filename(filename)) as fin:
+            manifest = gen_graph.json.load(fin)
+        edges = []
+        for shard in manifest['shards']:
+            with open(os.path.join(os.path.dirname(filename), shard['file'])) as fin:
+                lines = fin.read().splitlines()
+            self.assertEqual(lines[0], '%d %d' % (manifest['num_nodes'], shard['num_edges']))
+            edges.append(lines[1:])
+        return manifest, edges
+    def test_shards_range(self):
+        """ Test shards by node range keep the edges in order """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'g.txt')
+            argv = ['-gkn', '-n', '6', '--shards', '3', '--output', filename]
+            manifest, edges = self.shard_edges(argv, filename)
+        self.assertEqual(manifest['num_edges'], 15)
+        self.assertEqual([shard['num_nodes'] for shard in manifest['shards']], [2, 2, 2])
+        self.assertEqual(edges[2], ['4 5'])
+        self.assertEqual(sum(edges, []), ['%d %d' % (u, v) for u in range(6) for v in range(u + 1, 6)])
+    def test_shards_hash(self):
+        """ Test shards by node hash give each source node to one shard """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'g.txt')
+            argv = ['-grnm', '-n', '50', '-m', '300', '--seed', '1', '--engine', 'numpy',
+                    '--shards', '4', '--shard-by', 'hash', '--output', filename]
+            manifest, edges = self.shard_edges(argv, filename)
+        self.assertEqual(sum(shard['num_nodes'] for shard in manifest['shards']), 50)
+        sources = [set(line.split()[0] for line in shard) for shard in edges]
+        self.assertEqual(sum(len(nodes) for nodes in sources), len(set.union(*sources)))
+        self.assertEqual(sum(len(shard) for shard in edges), 300)
+    def test_shards_bin(self):
+        """ Test shards in a binary format """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'g.npy')
+            argv = ['-gpn', '-n', '5', '--shards', '2', '--format', 'npy', '--output', filename]
+            with patch('sys.stdout', new=StringIO()):
+                gen_graph.main(argv)
+            self.assertEqual(gen_graph.np.load(os.path.join(tmpdir, 'g.0.npy')).tolist(),
+                             [[0, 1], [1, 2], [2, 3]])
+            self.assertEqual(gen_graph.np.load(os.path.join(tmpdir, 'g.1.npy')).tolist(), [[3, 4]])
+    def test_shards_one_pass(self):
+        """ Test unseeded streamed shards are written in one pass after counting, with the
+        weights of the summary
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'u.txt')
+            argv = ['-gkn', '-n', '40', '-w', 'int', '--shards', '3', '--output', filename,
+                    '--summary']
+            chunks = gen_graph.EdgeStream.chunks
+            with patch.object(gen_graph.EdgeStream, 'chunks', autospec=True,
+                              side_effect=chunks) as passes:
+                manifest, edges = self.shard_edges(argv, filename)
+            self.assertEqual(passes.call_count, 2)
+            with open(os.path.join(tmpdir, 'u.summary.json')) as fin:
+                summary = gen_graph.json.load(fin)
+        weights = [int(line.split()[2]) for shard in edges for line in shard]
+        self.assertEqual(len(weights), 780)
+        self.assertAlmostEqual(summary['weight']['mean'], sum(weights) / len(weights))
+
+class TestServe(unittest.TestCase):
+    """ Unit tests for --serve request handling """
+    @staticmethod
+    def fetch_all(requests):
+        """ Send raw HTTP requests concurrently to a server on a free port, return responses """
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        async def exchange():
+            parser = gen_graph.create_parser(gen_graph.ApiArgumentParser, add_help=False)
+            with ThreadPoolExecutor(max_workers=2) as pool:
+                server = await asyncio.start_server(
+                    lambda r, w: gen_graph.handle_request(r, w, parser, pool), '127.0.0.1', 0)
+                port = server.sockets[0].getsockname()[1]
+                async def fetch(request):
+                    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+                    writer.write(request)
+                    await writer.drain()
+                    response = await reader.read()
+                    writer.close()
+                    return response
+                responses = await asyncio.gather(*[fetch(r) for r in requests])
+                server.close()
+                await server.wait_closed()
+            return responses
+        return asyncio.run(exchange())
+    def test_serve_get_post(self):
+        """ Test GET and POST requests stream the same edge list as main """
+        argv = ['-grnm', '-n', '30', '-m', '40', '--seed', '3', '-w', 'int']
+        with patch('sys.stdout', new=StringIO()) as redirect:
+            gen_graph.main(argv)
+            expected = redirect.getvalue().encode()
+        body = gen_graph.json.dumps({'grnm': True, 'n': 30, 'm': 40, 'seed': 3, 'w': 'int'})
+        requests = [b'GET /?grnm&n=30&m=40&seed=3&w=int HTTP/1.1\r\nHost: x\r\n\r\n',
+                    b'POST / HTTP/1.1\r\nContent-Length: %d\r\n\r\n%s' %
+                    (len(body), body.encode())] * 4
+        for response in self.fetch_all(requests):
+            head, _, edges = response.partition(b'\r\n\r\n')
+            self.assertTrue(head.startswith(b'HTTP/1.1 200 OK'))
+            self.assertEqual(edges, expected)
+    def test_serve_errors(self):
+        """ Test invalid and rejected options are answered with 400 """
+        requests = [b'GET /?grnm&n=5 HTTP/1.1\r\n\r\n',
+                    b'GET /?gpn&n=5&output=g.txt HTTP/1.1\r\n\r\n',
+                    b'GET /?gba&n=3&m=5 HTTP/1.1\r\n\r\n',
+                    b'DELETE / HTTP/1.1\r\n\r\n',
+                    b'GET /?help HTTP/1.1\r\n\r\n',
+                    b'GET /?grnm&n=5&m=5&help HTTP/1.1\r\n\r\n',
+                    b'POST / HTTP/1.1\r\nContent-Length: 1\r\n\r\n5']
+        responses = self.fetch_all(requests)
+        for response in responses:
+            self.assertTrue(response.startswith(b'HTTP/1.1 400 Bad Request'))
+        self.assertIn(b'Error: -m is required', responses[0])
+        self.assertIn(b'Error: --output is not supported by --serve', responses[1])
+        self.assertIn(b'Error: Barabasi-Albert network must have', responses[2])
+        self.assertIn(b'Error: a job must be an object, a list or a string', responses[6])
+    def test_serve_address(self):
+        """ Test --serve listens on localhost ports or unix sockets only """
+        self.assertEqual(gen_graph.serve_address('8080'), ('localhost', 8080))
+        self.assertEqual(gen_graph.serve_address('127.0.0.1:0'), ('127.0.0.1', 0))
+        self.assertEqual(gen_graph.serve_address('unix:gen.sock'), 'gen.sock')
+        self.assertEqual(gen_graph.serve_address('/tmp/gen.sock'), '/tmp/gen.sock')
+        for arg in ['0.0.0.0:80', 'example.com:80', 'localhost:http', '70000']:
+            with self.assertRaises(gen_graph.argparse.ArgumentTypeError):
+                gen_graph.serve_address(arg)
+
+class TestLoadGraph(unittest.TestCase):
+    """ Unit tests for loading output files with load_graph """
+    def write(self, tmpdir, name, argv):
+        """ Generate a graph into a file of tmpdir """
+        output = os.path.join(tmpdir, name)
+        with patch('sys.stdout', new=StringIO()):
+            gen_graph.main(['-grnm', '-n', '50', '-m', '120', '--seed', '2', '--output', output]
+                           + argv)
+        return output
+    def test_load_formats(self):
+        """ Test each output format loads the generated edges and weights """
+        np = gen_graph.np
+        expected = gen_graph.generate('grnm', n=50, m=120, seed=2, weights='int', array=True)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for name, argv in [('a.txt', []), ('b.txt.gz', ['--one-based']),
+                               ('c.npy', ['--format', 'npy']), ('d.bin', ['--format', 'bin']),
+                               ('e.npz', ['--format', 'npz-csr', '--one-based']),
+                               ('f.txt', ['--shards', '3'])]:
+                filename = self.write(tmpdir, name, argv + ['-w', 'int'])
+                if name == 'f.txt':
+                    filename = os.path.join(tmpdir, 'f.manifest.json')
+                graph = load_graph.load_graph(filename)
+                edges = np.column_stack((graph.src, graph.dst, graph.weight))
+                if name in ['e.npz', 'f.txt']:
+                    # grouped by source node
+                    edges = edges[np.argsort(edges[:, 0], kind='stable')]
+                    ref = expected[np.argsort(expected[:, 0], kind='stable')]
+                else:
+                    ref = expected
+                self.assertEqual(graph.number_of_nodes(), 50)
+                self.assertEqual(edges.tolist(), ref.tolist())
+    def test_load_empty_shard(self):
+        """ Test weights of a manifest with empty text shards, first or not """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            output = os.path.join(tmpdir, 't.txt')
+            argv = ['-tcn', '-c', '2', '-n', '7', '-w', 'int', '--seed', '1']
+            with patch('sys.stdout', new=StringIO()) as redirect:
+                gen_graph.main(argv)
+                expected = [int(line.split()[2]) for line in redirect.getvalue().splitlines()[1:]]
+            with patch('sys.stdout', new=StringIO()):
+                gen_graph.main(argv + ['--shards', '4', '--output', output])
+            filename = os.path.join(tmpdir, 't.manifest.json')
+            graph = load_graph.load_graph(filename)
+            self.assertEqual(graph.weight.tolist(), expected)
+            with open(filename) as fin:
+                manifest = gen_graph.json.load(fin)
+            self.assertEqual(manifest['shards'][-1]['num_edges'], 0)
+            manifest['shards'].reverse()
+            with open(filename, 'w') as fout:
+                gen_graph.json.dump(manifest, fout)
+            graph = load_graph.load_graph(filename)
+            self.assertEqual(sorted(graph.weight.tolist()), sorted(expected))
+    def test_load_float_csr(self):
+        """ Test float weights of text and csr arrays """
+        np = gen_graph.np
+        with tempfile.TemporaryDirectory() as tmpdir:
+            text = self.write(tmpdir, 'a.txt', ['-w', 'float'])
+            csr = self.write(tmpdir, 'b.npz', ['-w', 'float', '--format', 'npz-csr'])
+            indptr, indices, weights = load_graph.load_csr(text)
+            ref_indptr, ref_indices, ref_weights = load_graph.load_csr(csr)
+        self.assertEqual(indptr.tolist(), ref_indptr.tolist())
+        self.assertEqual(indices.tolist(), ref_indices.tolist())
+        self.assertTrue(np.allclose(weights, ref_weights))
+    def test_load_invalid(self):
+        """ Test a header that does not match the edges raises ValueError """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            filename = os.path.join(tmpdir, 'g.txt')
+            for text in ['3 2\n0 1\n', '3 1\n0 1\n1 2\n', '3 1\n0 3\n', '3\n0 1\n',
+                         '3 1\n0 x\n']:
+                with open(filename, 'w') as fout:
+                    fout.write(text)
+                with self.assertRaises(ValueError):
+                    load_graph.load_graph(filename)
+            with open(filename, 'w') as fout:
+                fout.write('3 2\n1 2\n2 3\n')
+            graph = load_graph.load_graph(filename)
+        self.assertEqual(graph.src.tolist(), [0, 1])
+        self.assertEqual(graph.dst.tolist(), [1, 2])
+
+class TestBenchmark(unittest.TestCase):
+    """ Unit tests for benchmarks """
+    def test_benchmark_case(self):
+        """ Test measurements of one benchmark case """
+        result = bench_gen_graph.run_case(['-gpn', '-n', '100', '-w', 'int'])
+        self.assertEqual(result['num_edges'], 99)
+        for stage in ['generate', 'output']:
+            self.assertGreater(result[stage]['seconds'], 0)
+            self.assertGreater(result[stage]['peak_rss_kb'], 0)
+    def test_benchmark_cases(self):
+        """ Test the grid of benchmark cases """
+        args = bench_gen_graph.create_parser().parse_args(['--types', 'grnm', 'tch', '--weights', 'none', 'float'])
+        cases = bench_gen_graph.make_cases(args)
+        self.assertEqual(len(cases), 4)
+        self.assertEqual(cases[3][1][:5], ['-tch', '-c', '2', '-h', '10'])
+        self.assertEqual(cases[3][1][-2:], ['-w', 'float'])
+    def test_benchmark_binary_format(self):
+        """ Test binary formats are written to the null device and invalid cases do not exit """
+        args = bench_gen_graph.create_parser().parse_args(['--types', 'gpn', '--format', 'npz-csr'])
+        argv = bench_gen_graph.make_cases(args)[0][1]
+        self.assertEqual(bench_gen_graph.run_case(argv)['num_edges'], 9999)
+        with patch('sys.stderr', new=StringIO()):
+            result = bench_gen_graph.run_case(['-gpn', '--format', 'bin'])
+        self.assertEqual(result['error'], 'invalid arguments')
+
 if __name__ == '__main__':
     unittest.main()